@@ -1,4 +1,5 @@
 """Nox sessions."""
+import hashlib
 import os
 import shutil
 import sys
@@ -19,15 +20,36 @@ nox.options.sessions = (
     "mypy",
     "tests",
     "typeguard",
-    "xdoctest",
     "docs-build",
 )
 
 
+def _install(session: Session, *groups: str) -> None:
+    """Install the project with the specified PDM groups.
+
+    Installation is skipped when the session environment was already installed
+    from the same lock file and groups.
+    """
+    digest = hashlib.sha256(
+        Path("pdm.lock").read_bytes()
+        + Path("pyproject.toml").read_bytes()
+        + b"|"
+        + ",".join(groups).encode()
+    ).hexdigest()
+    stamp = Path(session.virtualenv.location, ".pdm-stamp")
+    if stamp.exists() and stamp.read_text() == digest:
+        return
+    args = [arg for group in groups for arg in ("-G", group)]
+    # run_always returns None when installs are skipped (--no-install with a
+    # reused environment), the environment is not up to date in that case
+    if session.run_always("pdm", "install", *args, external=True) is not None:
+        stamp.write_text(digest)
+
+
 @session(name="pre-commit", python=python_versions[0])
 def precommit(session: Session) -> None:
     """Lint using pre-commit."""
-    session.run_always("pdm", "install", "-G", "lint", external=True)
+    _install(session, "lint")
     args = session.posargs or [
         "run",
         "--all-files",
@@ -39,7 +61,7 @@ def precommit(session: Session) -> None:
 @session(python=python_versions[0])
 def safety(session: Session) -> None:
     """Scan dependencies for insecure packages."""
-    session.run_always("pdm", "install", "-G", "safety", external=True)
+    _install(session, "safety")
     session.run("pdm", "export", "-o", "requirements.txt", "--without-hashes")
     session.run("safety", "check", "--full-report", "--file=requirements.txt")
 
@@ -47,9 +69,7 @@ def safety(session: Session) -> None:
 @session(python=python_versions[0])
 def mypy(session: Session) -> None:
     """Type-check using mypy."""
-    session.run_always(
-        "pdm", "install", "-G", "pil", "-G", "mypy", "-G", "tests", external=True
-    )
+    _install(session, "pil", "cache", "orjson", "ijson", "mypy", "tests")
     args = session.posargs or ["src", "tests", "docs/conf.py"]
     session.run("mypy", *args)
     if not session.posargs:
@@ -59,19 +79,10 @@ def mypy(session: Session) -> None:
 @session(python=python_versions)
 def tests(session: Session) -> None:
     """Run the test suite."""
-    session.run_always(
-        "pdm",
-        "install",
-        "-G",
-        "pil",
-        "-G",
-        "tests",
-        "-G",
-        "coverage",
-        external=True,
-    )
+    _install(session, "pil", "cache", "orjson", "ijson", "tests", "coverage")
+    args = session.posargs or ["-n", "auto", "--dist=loadfile"]
     try:
-        session.run("coverage", "run", "--parallel", "-m", "pytest", *session.posargs)
+        session.run("coverage", "run", "--parallel", "-m", "pytest", *args)
     finally:
         if session.interactive:
             session.notify("coverage", posargs=[])
@@ -80,7 +91,7 @@ def tests(session: Session) -> None:
 @session(python=python_versions[0])
 def coverage(session: Session) -> None:
     """Produce the coverage report."""
-    session.run_always("pdm", "install", "-G", "coverage", external=True)
+    _install(session, "coverage")
     args = session.posargs or ["report"]
 
     if not session.posargs and any(Path().glob(".coverage.*")):
@@ -91,25 +102,24 @@ def coverage(session: Session) -> None:
 
 @session(python=python_versions[0])
 def typeguard(session: Session) -> None:
-    """Runtime type checking using Typeguard."""
-    session.run_always(
-        "pdm",
-        "install",
-        "-G",
-        "pil",
-        "-G",
-        "typeguard",
-        "-G",
-        "tests",
-        external=True,
+    """Runtime type checking using Typeguard and examples using xdoctest.
+
+    Test and doctest collection share a single pytest run.
+    """
+    _install(
+        session, "pil", "cache", "orjson", "ijson", "typeguard", "xdoctest", "tests"
     )
-    session.run("pytest", f"--typeguard-packages={package}", *session.posargs)
+    args = session.posargs or ["-n", "auto", "--dist=loadfile", "tests", "src"]
+    session.run("pytest", f"--typeguard-packages={package}", "--xdoctest", *args)
 
 
 @session(python=python_versions)
 def xdoctest(session: Session) -> None:
-    """Run examples with xdoctest."""
-    session.run_always("pdm", "install", "-G", "pil", "-G", "xdoctest", external=True)
+    """Run examples with xdoctest.
+
+    Examples are also run as part of the typeguard session.
+    """
+    _install(session, "pil", "xdoctest")
     if session.posargs:
         args = [package, *session.posargs]
     else:
@@ -123,14 +133,17 @@ def xdoctest(session: Session) -> None:
 @session(name="docs-build", python=python_versions[0])
 def docs_build(session: Session) -> None:
     """Build the documentation."""
-    session.run_always("pdm", "install", "-G", "pil", "-G", "docs", external=True)
-    args = session.posargs or ["docs", "docs/_build"]
-    if not session.posargs and "FORCE_COLOR" in os.environ:
+    _install(session, "pil", "docs")
+    clean = "--clean" in session.posargs
+    posargs = [arg for arg in session.posargs if arg != "--clean"]
+    args = posargs or ["-j", "auto", "-d", "docs/_doctrees", "docs", "docs/_build"]
+    if not posargs and "FORCE_COLOR" in os.environ:
         args.insert(0, "--color")
 
-    build_dir = Path("docs", "_build")
-    if build_dir.exists():
-        shutil.rmtree(build_dir)
+    if clean:
+        for build_dir in (Path("docs", "_build"), Path("docs", "_doctrees")):
+            if build_dir.exists():
+                shutil.rmtree(build_dir)
 
     session.run("sphinx-build", *args)
 
@@ -138,7 +151,7 @@ def docs_build(session: Session) -> None:
 @session(python=python_versions[0])
 def docs(session: Session) -> None:
     """Build and serve the documentation with live reloading on file changes."""
-    session.run_always("pdm", "install", "-G", "pil", "-G", "docs", external=True)
+    _install(session, "pil", "docs")
     args = session.posargs or ["--open-browser", "docs", "docs/_build"]
 
     build_dir = Path("docs", "_build")
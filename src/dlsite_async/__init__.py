@@ -4,7 +4,7 @@ from .api import DlsiteAPI
 from .circle import Circle, MakerType
 from .play.api import PlayAPI
 from .play.ebook import EbookSession
-from .utils import find_maker_id, find_product_id
+from .utils import find_ids, find_maker_id, find_product_id
 from .work import AgeCategory, BookType, Work, WorkType
 
 
@@ -19,6 +19,7 @@ __all__ = [
     "Work",
     "WorkType",
     "exceptions",
+    "find_ids",
     "find_maker_id",
     "find_product_id",
 ]
@@ -1,13 +1,14 @@
 """HTML scraper."""
+import codecs
 import logging
 import re
 import unicodedata
-from abc import ABC, abstractmethod
 from datetime import datetime
+from functools import lru_cache
 from html import unescape
-from typing import Any, Iterable, Optional, cast
+from typing import Any, AsyncIterable, Callable, Iterable, NamedTuple, cast
 
-from lxml import html
+from lxml import etree, html
 from lxml.html import soupparser
 
 from .exceptions import ScrapingError
@@ -21,166 +22,270 @@ def _unescape(content: str) -> str:
     return unicodedata.normalize("NFKC", unescape(content)).strip()
 
 
+@lru_cache(maxsize=4096)
+def _unescape_short(content: str) -> str:
+    """Return unescaped and normalized HTML content.
+
+    Cached variant of `_unescape` for short, frequently repeated strings (i.e.
+    table headers and tag names).
+    """
+    return _unescape(content)
+
+
 _INVALID_XML_RANGES = [
-    f"{chr(low)}-{chr(high)}"
-    for low, high in [
-        (0x00, 0x08),
-        (0x0B, 0x0C),
-        (0x0E, 0x1F),
-        (0x7F, 0x84),
-        (0x86, 0x9F),
-    ]
+    (0x00, 0x08),
+    (0x0B, 0x0C),
+    (0x0E, 0x1F),
+    (0x7F, 0x84),
+    (0x86, 0x9F),
 ]
-_INVALID_XML_RE = re.compile("[{}]".format("".join(_INVALID_XML_RANGES)))
+_INVALID_XML_RE = re.compile(
+    "[{}]".format(
+        "".join(f"{chr(low)}-{chr(high)}" for low, high in _INVALID_XML_RANGES)
+    )
+)
+_INVALID_XML_TABLE = dict.fromkeys(
+    (c for low, high in _INVALID_XML_RANGES for c in range(low, high + 1)), None
+)
 
 
 def _clean_xml(content: str) -> str:
     """Strip invalid XML characters from HTML content."""
+    # str.translate is only faster than the regex for pure ASCII strings, for
+    # non-ASCII content it falls back to a (much slower) per-character lookup
+    if content.isascii():
+        return content.translate(_INVALID_XML_TABLE)
     return _INVALID_XML_RE.sub("", content)
 
 
-class _RowParser(ABC):
-    """Work outline table row parser."""
-
-    def __init__(self, field: str, headers: Iterable[str]):
-        self.field = field
-        self.headers = set(headers)
-
-    def can_parse(self, th: html.HtmlElement) -> bool:
-        """Return whether or not row can be parsed based on header."""
-        header = _unescape(th.text_content())
-        return header in self.headers
+_HTML_PARSER = html.HTMLParser(recover=True, encoding="utf-8")
 
-    @abstractmethod
-    def parse_value(self, td: html.HtmlElement) -> Any:
-        """Parse the specfied table cell value."""
-        return _unescape(td.text_content())
+# XPath expressions are compiled once at import time
+_XPath = Callable[[html.HtmlElement], list[Any]]
 
+_XP_WORK_MAKER_ROWS = cast(_XPath, etree.XPath('//table[@id="work_maker"]//tr'))
+_XP_WORK_OUTLINE = cast(_XPath, etree.XPath('//table[@id="work_outline"]'))
+_XP_WORK_OUTLINE_ROWS = cast(_XPath, etree.XPath('//table[@id="work_outline"]//tr'))
+_XP_TH = cast(_XPath, etree.XPath("(.//th)[1]"))
+_XP_TD = cast(_XPath, etree.XPath("(.//td)[1]"))
+_XP_SLIDER_IMAGES = cast(
+    _XPath,
+    etree.XPath(
+        '//div[@class="product-slider-data"]//div'
+        '[@data-src != "" and not(contains(@data-src, "_img_main"))]/@data-src'
+    ),
+)
+_XP_DESCRIPTION = cast(_XPath, etree.XPath('//meta[@name="description"]'))
+_XP_MAKER_NAME = cast(_XPath, etree.XPath('.//span[@class="maker_name"]'))
+_XP_LINKS = cast(_XPath, etree.XPath(".//a"))
+_XP_PROF_MAKER_NAME = cast(_XPath, etree.XPath('//strong[@class="prof_maker_name"]'))
+_XP_LOGIN_TOKEN = cast(_XPath, etree.XPath('.//input[@name="_token"]/@value'))
+
+
+def _fromstring(content: str, required: _XPath) -> html.HtmlElement:
+    """Parse HTML content.
+
+    Content is parsed with the native lxml parser. If the native parser fails or
+    the resulting tree does not contain the `required` XPath (i.e. due to
+    malformed markup), content is re-parsed with BeautifulSoup.
+    """
+    content = _clean_xml(content)
+    try:
+        tree = html.fromstring(content, parser=_HTML_PARSER)
+        if required(tree):
+            return tree
+    except etree.ParserError:
+        pass
+    return soupparser.fromstring(content)
+
+
+async def _parse_stream(
+    chunks: AsyncIterable[bytes], required: _XPath
+) -> html.HtmlElement:
+    """Incrementally parse streamed UTF-8 HTML content.
+
+    Chunks are decoded, stripped of invalid XML characters and fed into the
+    native lxml parser as they are received. Cleaned content is only re-parsed
+    with BeautifulSoup if the native parser fails or the resulting tree does not
+    contain the `required` XPath.
+    """
+    parser = html.HTMLParser(recover=True)
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    # BeautifulSoup fallback needs the complete document, keep the (already
+    # decoded) text parts rather than a second raw copy of the response
+    parts: list[str] = []
+
+    def _feed(text: str) -> None:
+        if text:
+            text = _clean_xml(text)
+            parts.append(text)
+            parser.feed(text)
+
+    async for chunk in chunks:
+        _feed(decoder.decode(chunk))
+    _feed(decoder.decode(b"", final=True))
+    try:
+        tree = cast(html.HtmlElement, parser.close())
+        if required(tree):
+            return tree
+    except etree.LxmlError:
+        pass
+    return soupparser.fromstring("".join(parts))
+
+
+_DATE_JP = re.compile(r"^(\d{4})年(\d{1,2})月(\d{1,2})日$")
+_DATE_EN = re.compile(r"^([A-Za-z]+)/(\d{1,2})/(\d{4})$")
+_MONTHS = {
+    name.lower(): month
+    for month, full_name in enumerate(
+        (
+            "January",
+            "February",
+            "March",
+            "April",
+            "May",
+            "June",
+            "July",
+            "August",
+            "September",
+            "October",
+            "November",
+            "December",
+        ),
+        start=1,
+    )
+    for name in (full_name, full_name[:3])
+}
+
+
+def _to_datetime(value: str) -> datetime:
+    try:
+        m = _DATE_JP.match(value)
+        if m:
+            return datetime(int(m[1]), int(m[2]), int(m[3]))
+        m = _DATE_EN.match(value)
+        if m and m[1].lower() in _MONTHS:
+            return datetime(int(m[3]), _MONTHS[m[1].lower()], int(m[2]))
+    except ValueError:  # pragma: no cover
+        pass
+    for fmt in ("%Y年%m月%d日", "%b/%d/%Y", "%B/%d/%Y"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:  # pragma: no cover
+            pass
+    raise ScrapingError(f"Failed to parse date string {value}")
 
-class _DateRowParser(_RowParser):
-    """Date row parser."""
-
-    def parse_value(self, td: html.HtmlElement) -> datetime:
-        """Parse the specfied table cell value."""
-        value = cast(str, super().parse_value(td))
-        return self._to_datetime(value.split()[0])
-
-    @staticmethod
-    def _to_datetime(value: str) -> datetime:
-        for fmt in ("%Y年%m月%d日", "%b/%d/%Y", "%B/%d/%Y"):
-            try:
-                return datetime.strptime(value, fmt)
-            except ValueError:  # pragma: no cover
-                pass
-        raise ScrapingError(f"Failed to parse date string {value}")
 
+def _parse_text(td: html.HtmlElement) -> str:
+    """Parse a text table cell value."""
+    return _unescape(td.text_content())
 
-class _IntRowParser(_RowParser):
-    """Integer row parser."""
 
-    def parse_value(self, td: html.HtmlElement) -> int:
-        """Parse the specfied table cell value."""
-        try:
-            value = super().parse_value(td)
-            return int(value)
-        except ValueError as e:  # pragma: no cover
-            raise ScrapingError(f"Failed to parse integer {value}") from e
+def _parse_date(td: html.HtmlElement) -> datetime:
+    """Parse a date table cell value."""
+    return _to_datetime(_unescape(td.text_content()).split()[0])
 
 
-class _MakerRowParser(_RowParser):
-    """Maker row parser."""
+def _parse_int(td: html.HtmlElement) -> int:
+    """Parse an integer table cell value."""
+    value = _unescape(td.text_content())
+    try:
+        return int(value)
+    except ValueError as e:  # pragma: no cover
+        raise ScrapingError(f"Failed to parse integer {value}") from e
 
-    def parse_value(self, td: html.HtmlElement) -> str:
-        """Parse the specfied table cell value."""
-        try:
-            span = td.xpath('//span[@class="maker_name"]')[0]
-        except IndexError as e:  # pragma: no cover
-            raise ScrapingError(f"Failed to parse cell {td}") from e
-        return _unescape(cast(str, span.text_content()))
 
+def _parse_maker(td: html.HtmlElement) -> str:
+    """Parse a maker table cell value."""
+    try:
+        span = _XP_MAKER_NAME(td)[0]
+    except IndexError as e:  # pragma: no cover
+        raise ScrapingError(f"Failed to parse cell {td}") from e
+    return _unescape(span.text_content())
 
-class _ListRowParser(_RowParser):
-    """Item list row parser."""
 
-    def parse_value(self, td: html.HtmlElement) -> list[str]:
-        """Parse the specfied table cell value."""
-        return [_unescape(a.text_content()) for a in td.xpath(".//a")]
+def _parse_list(td: html.HtmlElement) -> list[str]:
+    """Parse an item list table cell value."""
+    return [_unescape_short(a.text_content()) for a in _XP_LINKS(td)]
 
 
-class _TextRowParser(_RowParser):
-    """Text row parser."""
+class _RowParser(NamedTuple):
+    """Work outline table row parser."""
 
-    def parse_value(self, td: html.HtmlElement) -> str:
-        """Parse the specfied table cell value."""
-        return cast(str, super().parse_value(td))
+    field: str
+    headers: tuple[str, ...]
+    parse_value: Callable[[html.HtmlElement], Any]
 
 
 _parsers = [
-    _DateRowParser("announce_date", ("予告開始日", "Published date")),
-    _DateRowParser(
+    _RowParser("announce_date", ("予告開始日", "Published date"), _parse_date),
+    _RowParser(
         "modified_date",
         ("最終更新日", "更新情報", "Last updated", "Update information"),
+        _parse_date,
     ),
-    _IntRowParser("page_count", ("ページ数", "Page count")),
-    _MakerRowParser("brand", ("ブランド名", "Brand")),
-    _MakerRowParser("circle", ("サークル名", "Circle")),
-    _MakerRowParser("publisher", ("出版社名", "Publisher")),
-    _MakerRowParser("label", ("レーベル", "Label")),
-    _ListRowParser("author", ("作者", "著者", "Author")),
-    _ListRowParser("event", ("イベント", "Event")),
-    _ListRowParser("file_format", ("ファイル形式", "File format")),
-    _ListRowParser("illustration", ("イラスト", "Illustration")),
-    _ListRowParser("genre", ("ジャンル", "Genre")),
-    _ListRowParser("music", ("音楽", "Music")),
-    _ListRowParser("scenario", ("シナリオ", "Scenario")),
-    _ListRowParser("voice_actor", ("声優", "Voice Actor")),
-    _ListRowParser("writer", ("作家", "Writer")),
-    _TextRowParser("file_size", ("ファイル容量", "File size")),
-    _TextRowParser("series", ("シリーズ名", "Series", "Series name")),
+    _RowParser("page_count", ("ページ数", "Page count"), _parse_int),
+    _RowParser("brand", ("ブランド名", "Brand"), _parse_maker),
+    _RowParser("circle", ("サークル名", "Circle"), _parse_maker),
+    _RowParser("publisher", ("出版社名", "Publisher"), _parse_maker),
+    _RowParser("label", ("レーベル", "Label"), _parse_maker),
+    _RowParser("author", ("作者", "著者", "Author"), _parse_list),
+    _RowParser("event", ("イベント", "Event"), _parse_list),
+    _RowParser("file_format", ("ファイル形式", "File format"), _parse_list),
+    _RowParser("illustration", ("イラスト", "Illustration"), _parse_list),
+    _RowParser("genre", ("ジャンル", "Genre"), _parse_list),
+    _RowParser("music", ("音楽", "Music"), _parse_list),
+    _RowParser("scenario", ("シナリオ", "Scenario"), _parse_list),
+    _RowParser("voice_actor", ("声優", "Voice Actor"), _parse_list),
+    _RowParser("writer", ("作家", "Writer"), _parse_list),
+    _RowParser("file_size", ("ファイル容量", "File size"), _parse_text),
+    _RowParser("series", ("シリーズ名", "Series", "Series name"), _parse_text),
 ]
+_PARSER_BY_HEADER: dict[str, _RowParser] = {
+    header: parser for parser in _parsers for header in parser.headers
+}
 
 
 def parse_work_html(content: str) -> dict[str, Any]:
     """Parse work HTML."""
-    tree = soupparser.fromstring(_clean_xml(content))
+    return _parse_work_tree(_fromstring(content, _XP_WORK_OUTLINE))
+
+
+async def parse_work_stream(chunks: AsyncIterable[bytes]) -> dict[str, Any]:
+    """Parse streamed work HTML."""
+    return _parse_work_tree(await _parse_stream(chunks, _XP_WORK_OUTLINE))
+
+
+def _parse_work_tree(tree: html.HtmlElement) -> dict[str, Any]:
     info: dict[str, Any] = {}
-    for table in (
-        '//table[@id="work_maker"]//tr',
-        '//table[@id="work_outline"]//tr',
-    ):
-        info.update(_parse_work_outline_rows(cast(html.HtmlElement, tree.xpath(table))))
-    for div in ('//div[@class="product-slider-data"]//div',):
-        (info.update(_parse_work_slider_data(cast(html.HtmlElement, tree.xpath(div)))),)
-    for meta in tree.xpath('//meta[@name="description"]'):
-        info.update(_parse_work_description(cast(html.HtmlElement, meta)))
+    for table in (_XP_WORK_MAKER_ROWS, _XP_WORK_OUTLINE_ROWS):
+        info.update(_parse_work_outline_rows(table(tree)))
+    info.update(_parse_work_slider_data(tree))
+    for meta in _XP_DESCRIPTION(tree):
+        info.update(_parse_work_description(meta))
     return info
 
 
 def _parse_work_outline_rows(trs: Iterable[html.HtmlElement]) -> Any:
     for tr in trs:
         try:
-            th = tr.xpath(".//th")[0]
-            td = tr.xpath(".//td")[0]
+            th = _XP_TH(tr)[0]
+            td = _XP_TD(tr)[0]
         except IndexError:  # pragma: no cover
             logger.exception(f"Failed to parse outline row: {tr}")
             continue
-        for parser in _parsers:
-            if parser.can_parse(th):
-                try:
-                    yield parser.field, parser.parse_value(td)
-                except ScrapingError:  # pragma: no cover
-                    pass
-                break
-        else:
+        parser = _PARSER_BY_HEADER.get(_unescape_short(th.text_content()))
+        if parser is None:
             logger.debug(f"No matching parser for outline row: {tr}")
+            continue
+        try:
+            yield parser.field, parser.parse_value(td)
+        except ScrapingError:  # pragma: no cover
+            pass
 
 
-def _parse_work_slider_data(divs: Iterable[html.HtmlElement]) -> Any:
-    images = []
-    for div in divs:
-        src = div.get("data-src")
-        if src and "_img_main" not in src:
-            images.append(src)
+def _parse_work_slider_data(tree: html.HtmlElement) -> Any:
+    images = [str(src) for src in _XP_SLIDER_IMAGES(tree)]
     return {"sample_images": images} if images else {}
 
 
@@ -192,27 +297,35 @@ def _parse_work_description(meta: html.HtmlElement) -> Any:
     content = meta.get("content")
     if content:
         content = _unescape(content)
-        content = _DESC_EN.sub("", content).strip()
-        content = _DESC_JP.sub("", content).strip()
+        # both patterns are anchored to the end of the (stripped) description,
+        # skip the regex search entirely when the suffix cannot match
+        if content.endswith("DLsite!"):
+            content = _DESC_EN.sub("", content).strip()
+        if content.endswith("」!"):
+            content = _DESC_JP.sub("", content).strip()
     return {"description": content} if content else {}
 
 
 def parse_circle_html(content: str) -> dict[str, Any]:
     """Parse circle HTML."""
-    tree = soupparser.fromstring(_clean_xml(content))
-    for strong in tree.xpath('//strong[@class="prof_maker_name"]'):
-        info: dict[str, Any] = {
-            "maker_name": _unescape(cast(html.HtmlElement, strong).text_content())
-        }
+    return _parse_circle_tree(_fromstring(content, _XP_PROF_MAKER_NAME))
+
+
+async def parse_circle_stream(chunks: AsyncIterable[bytes]) -> dict[str, Any]:
+    """Parse streamed circle HTML."""
+    return _parse_circle_tree(await _parse_stream(chunks, _XP_PROF_MAKER_NAME))
+
+
+def _parse_circle_tree(tree: html.HtmlElement) -> dict[str, Any]:
+    for strong in _XP_PROF_MAKER_NAME(tree):
+        info: dict[str, Any] = {"maker_name": _unescape(strong.text_content())}
         return info
     raise ScrapingError("Failed to find maker name")  # pragma: no cover
 
 
 def parse_login_token(content: str) -> str:
     """Parse login form token."""
-    tree = soupparser.fromstring(_clean_xml(content))
-    for input_ in cast(html.HtmlElement, tree.xpath('.//input[@name="_token"]')):
-        token: Optional[str] = input_.get("value")
-        if token is not None:
-            return token
+    tree = _fromstring(content, _XP_LOGIN_TOKEN)
+    for token in _XP_LOGIN_TOKEN(tree):
+        return str(token)
     raise ScrapingError("Failed to find login form token.")
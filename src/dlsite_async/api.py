@@ -1,33 +1,67 @@
 """DLsite API classes."""
+import asyncio
+import logging
+import os
+from collections.abc import Mapping
 from contextlib import AbstractAsyncContextManager, AsyncExitStack
 from dataclasses import replace
 from datetime import datetime
 from netrc import netrc
-from typing import Any, Optional, TypeVar
-
-from aiohttp import ClientSession, ClientTimeout
+from pathlib import Path
+from typing import IO, Any, Awaitable, Callable, Optional, TypeVar, Union, cast
+
+from aiohttp import (
+    ClientResponse,
+    ClientResponseError,
+    ClientSession,
+    ClientTimeout,
+    TCPConnector,
+)
 from aiohttp.client import _RequestContextManager
-
-from ._scraper import parse_circle_html, parse_login_token, parse_work_html
+from yarl import URL
+
+from ._scraper import (
+    parse_circle_html,
+    parse_circle_stream,
+    parse_login_token,
+    parse_work_html,
+    parse_work_stream,
+)
 from .circle import Circle
 from .exceptions import AuthenticationError, DlsiteError
+from .utils import json_loads
 from .work import AgeCategory, BookType, Work, WorkType
 
 
+logger = logging.getLogger(__name__)
+
 _T = TypeVar("_T")
+_R = TypeVar("_R")
+
+_LOGIN_SUCCESS_BYTES = "ログイン中です".encode()
 
 
 def _datetime_from_timestamp(timestamp: str) -> datetime:
-    return datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+    # "%Y-%m-%d %H:%M:%S" is accepted by fromisoformat, which is much faster
+    # than strptime
+    return datetime.fromisoformat(timestamp)
 
 
 class BaseAPI(AbstractAsyncContextManager["_T"]):
     """Base DLsite API session.
 
     Args:
+        cache_dir: Optional directory for an on-disk cache of idempotent API
+            responses (requires optional ``dlsite-async[cache]`` dependency
+            packages). By default responses are not cached.
+        cache_ttl: Cached response lifetime in seconds (``None`` to never expire).
+        warm_up: Open a connection to the API host in the background on enter so
+            that the first request does not pay for TCP/TLS setup. Disabled by
+            default.
         kwargs: Keyword args to pass into aiohttp.ClientSession.
     """
 
+    # Downloads are written to disk in blocks of (at least) this size
     _DL_CHUNK_SIZE = 1024 * 1024
     _DL_TIMEOUT = ClientTimeout(
         total=None,
@@ -35,13 +69,70 @@ class BaseAPI(AbstractAsyncContextManager["_T"]):
         sock_connect=None,
         sock_read=None,
     )
-
-    def __init__(self, **kwargs: Any):
+    _TIMEOUT = ClientTimeout(total=None, sock_connect=30, sock_read=60)
+    # Larger response read buffer (aiohttp default is 64KiB) so that HTML pages
+    # and downloads need fewer buffer resizes
+    _READ_BUFSIZE = 256 * 1024
+    # Connection to this URL is opened in the background on __aenter__ when
+    # warm_up is enabled
+    _WARMUP_URL: Optional[str] = None
+
+    def __init__(
+        self,
+        cache_dir: Optional[Union[str, Path]] = None,
+        cache_ttl: Optional[float] = 24 * 60 * 60,
+        warm_up: bool = False,
+        **kwargs: Any,
+    ):
         self._exit_stack = AsyncExitStack()
         kwargs["raise_for_status"] = True
+        if "connector" not in kwargs:
+            # Play API advertises up to 500 concurrent requests, all to the same
+            # few hosts, keep connections (and DNS lookups) around between them
+            kwargs["connector"] = TCPConnector(
+                limit=1000,
+                limit_per_host=500,
+                ttl_dns_cache=300,
+                keepalive_timeout=75,
+            )
+        kwargs.setdefault("timeout", self._TIMEOUT)
+        kwargs.setdefault("read_bufsize", self._READ_BUFSIZE)
         self.session = ClientSession(**kwargs)
         self._exit_stack.push_async_exit(self.session)
         self._authed = False
+        self._warm_up_enabled = warm_up
+        self._warmup: Optional[asyncio.Task[None]] = None
+        self._cache: Optional[Any] = None
+        self._cache_ttl = cache_ttl
+        if cache_dir is not None:
+            try:
+                from diskcache import Cache
+            except ImportError:  # pragma: no cover
+                logger.warning(
+                    "Response caching requires installation with dlsite-async[cache]"
+                )
+            else:
+                self._cache = Cache(str(cache_dir))
+                self._exit_stack.callback(self._cache.close)
+
+    async def __aenter__(self) -> _T:
+        if self._warm_up_enabled and self._WARMUP_URL and self._warmup is None:
+            task = asyncio.create_task(self._warm_up(self._WARMUP_URL))
+            self._warmup = task
+
+            async def _cancel() -> None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+            self._exit_stack.push_async_callback(_cancel)
+        return cast(_T, self)
+
+    async def _warm_up(self, url: str) -> None:
+        try:
+            async with self.session.head(url, allow_redirects=False):
+                pass
+        except Exception as exc:
+            logger.debug("Connection warm-up failed: %s", exc)
 
     async def __aexit__(self, *args: Any) -> None:
         await self.close()
@@ -55,6 +146,69 @@ class BaseAPI(AbstractAsyncContextManager["_T"]):
         """Perform get request."""
         return self.session.get(*args, **kwargs)
 
+    def _cache_key(self, url: str, params: Mapping[str, Any]) -> str:
+        return str(URL(url).update_query(params))
+
+    async def _cached_read(
+        self, url: str, params: Optional[Mapping[str, Any]] = None
+    ) -> Optional[bytes]:
+        """Return response content for an idempotent GET request.
+
+        Content is served from and stored to the response cache when one is
+        configured. Returns ``None`` for non-200 responses (which are not cached).
+        """
+        params = params or {}
+        key = self._cache_key(url, params)
+        # diskcache does blocking SQLite and file I/O
+        if self._cache is not None:
+            content: Optional[bytes] = await asyncio.to_thread(self._cache.get, key)
+            if content is not None:
+                return content
+        async with self.get(url, params=params) as response:
+            if response.status != 200:
+                return None
+            content = await response.read()
+        if self._cache is not None:
+            await asyncio.to_thread(
+                self._cache.set, key, content, expire=self._cache_ttl
+            )
+        return content
+
+    @staticmethod
+    def _preallocate(response: ClientResponse, fp: IO[bytes]) -> None:
+        """Preallocate disk space for response content when its size is known.
+
+        Blocking, run in a worker thread (without native fallocate support,
+        glibc writes every block of the allocation).
+        """
+        size = response.content_length
+        # encoded content length would not match the (decoded) written size
+        if not size or response.headers.get("Content-Encoding"):
+            return
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fp.fileno(), 0, size)
+            except OSError:  # pragma: no cover
+                pass
+
+    async def _write_response(self, response: ClientResponse, fp: IO[bytes]) -> None:
+        """Write response content to a file.
+
+        Content is buffered into `_DL_CHUNK_SIZE` blocks and blocking writes are
+        run in a worker thread so disk I/O does not stall the event loop.
+        """
+        await asyncio.to_thread(self._preallocate, response, fp)
+        buf = bytearray()
+        # iter_any yields whatever has been received rather than re-slicing the
+        # stream buffer into fixed size chunks
+        async for chunk in response.content.iter_any():
+            buf += chunk
+            if len(buf) >= self._DL_CHUNK_SIZE:
+                await asyncio.to_thread(fp.write, buf)
+                buf = bytearray()
+        if buf:
+            await asyncio.to_thread(fp.write, buf)
+
     def post(self, *args: Any, **kwargs: Any) -> _RequestContextManager:
         """Perform post request."""
         return self.session.post(*args, **kwargs)
@@ -98,7 +252,7 @@ class BaseAPI(AbstractAsyncContextManager["_T"]):
             "password": password,
         }
         async with self.post(url, data=payload) as response:
-            if "ログイン中です" not in await response.text():
+            if _LOGIN_SUCCESS_BYTES not in await response.read():
                 raise AuthenticationError("DLsite login failed.")
         self._authed = True
 
@@ -108,33 +262,75 @@ class DlsiteAPI(BaseAPI["DlsiteAPI"]):
 
     Args:
         locale: Optional locale. Defaults to ``ja_JP``.
+        cache_dir: Optional directory for an on-disk cache of work, circle and
+            product info responses (requires optional ``dlsite-async[cache]``
+            dependency packages). By default responses are not cached.
+        cache_ttl: Cached response lifetime in seconds (``None`` to never expire).
+        warm_up: Open a connection to DLsite in the background on enter.
+            Disabled by default.
     """
 
-    def __init__(self, locale: Optional[str] = None, **kwargs: Any):
-        super().__init__(cookies={"adultchecked": "1"})
-        self.locale = locale
+    _HTML_CHUNK_SIZE = 64 * 1024
+    _WARMUP_URL = "https://www.dlsite.com/"
 
-    @property
-    def _common_params(self) -> dict[str, str]:
-        return {"locale": self.locale} if self.locale else {}
+    def __init__(
+        self,
+        locale: Optional[str] = None,
+        cache_dir: Optional[Union[str, Path]] = None,
+        cache_ttl: Optional[float] = 24 * 60 * 60,
+        warm_up: bool = False,
+        **kwargs: Any,
+    ):
+        super().__init__(
+            cache_dir=cache_dir,
+            cache_ttl=cache_ttl,
+            warm_up=warm_up,
+            cookies={"adultchecked": "1"},
+        )
+        self.locale = locale
+        self._common_params: dict[str, str] = {"locale": locale} if locale else {}
+        self._inflight: dict[str, asyncio.Task[Any]] = {}
 
     def get(self, *args: Any, **kwargs: Any) -> _RequestContextManager:
         """Perform get request."""
-        if "params" in kwargs:
-            kwargs["params"].update(self._common_params)
+        params = kwargs.pop("params", None)
+        if params:
+            params = {**params, **self._common_params}
         else:
-            kwargs["params"] = self._common_params
-        return super().get(*args, **kwargs)
+            params = self._common_params
+        return super().get(*args, params=params, **kwargs)
+
+    def _cache_key(self, url: str, params: Mapping[str, Any]) -> str:
+        return super()._cache_key(url, {**params, **self._common_params})
+
+    async def _single_flight(self, key: str, func: Callable[[], Awaitable[_R]]) -> _R:
+        """Await `func`, sharing one call between concurrent callers of `key`."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield so that one cancelled caller does not cancel the shared request
+        result: _R = await asyncio.shield(task)
+        return result
 
     async def get_work(self, product_id: str) -> Work:
         """Return the specified work.
 
+        Concurrent requests for the same work share a single set of API
+        requests.
+
         Args:
             product_id: DLsite product ID.
 
         Returns:
             Complete work information.
         """
+        return await self._single_flight(
+            f"work:{product_id}", lambda: self._get_work(product_id)
+        )
+
+    async def _get_work(self, product_id: str) -> Work:
         work = await self.product_info(product_id)
         return await self._fill_work_details(work)
 
@@ -151,9 +347,8 @@ class DlsiteAPI(BaseAPI["DlsiteAPI"]):
             DlsiteError: Failed to get product info.
         """
         url = "https://www.dlsite.com/maniax/product/info/ajax"
-        params = {"product_id": product_id}
-        async with self.get(url, params=params) as response:
-            data = await response.json()
+        content = await self._cached_read(url, params={"product_id": product_id})
+        data = json_loads(content) if content else None
         if not data or product_id not in data:
             raise DlsiteError(f"Failed to get product info for {product_id}")
         info = data[product_id]
@@ -167,31 +362,61 @@ class DlsiteAPI(BaseAPI["DlsiteAPI"]):
         return Work.from_dict(info)
 
     async def _fill_work_details(self, work: Work) -> Work:
-        html = await self._fetch_work_html(work)
-        if not html:
+        details = await self._fetch_work_details(work)
+        if not details:
             return work
-        details = parse_work_html(html)
         return replace(work, **details)
 
-    async def _fetch_work_html(self, work: Work) -> Optional[str]:
+    async def _fetch_work_details(self, work: Work) -> Optional[dict[str, Any]]:
+        types = ["work"]
+        # announce page only exists for works which have not been released yet
+        if work.regist_date is None or work.regist_date > datetime.now():
+            types.append("announce")
         urls = [
             (
                 f"https://www.dlsite.com/{work.site_id}/{typ}"
                 f"/=/product_id/{work.product_id}.html"
             )
-            for typ in ("work", "announce")
+            for typ in types
         ]
-        html: Optional[str] = None
-        for url in urls:
-            async with self.get(url) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    break
-        return html
+        # Request all pages concurrently but keep URL priority: the announce
+        # page is only used when the work page is unavailable.
+        tasks = [asyncio.create_task(self._fetch_work_page(url)) for url in urls]
+        try:
+            for i, task in enumerate(tasks):
+                try:
+                    details = await task
+                except ClientResponseError:
+                    if i == len(tasks) - 1:
+                        raise
+                    continue
+                if details is not None:
+                    return details
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _fetch_work_page(self, url: str) -> Optional[dict[str, Any]]:
+        if self._cache is not None:
+            content = await self._cached_read(url)
+            if content is None:
+                return None
+            # same lossy decoding as the streamed path
+            return parse_work_html(content.decode(errors="replace"))
+        async with self.get(url) as response:
+            if response.status == 200:
+                return await parse_work_stream(
+                    response.content.iter_chunked(self._HTML_CHUNK_SIZE)
+                )
+        return None
 
     async def get_circle(self, maker_id: str) -> Circle:
         """Return the specified circle.
 
+        Concurrent requests for the same circle share a single API request.
+
         Args:
             maker_id: DLsite maker ID.
 
@@ -201,19 +426,31 @@ class DlsiteAPI(BaseAPI["DlsiteAPI"]):
         Raises:
             DlsiteError: Failed to fetch circle information.
         """
-        html = await self._fetch_circle_html(maker_id)
-        if not html:
+        return await self._single_flight(
+            f"circle:{maker_id}", lambda: self._get_circle(maker_id)
+        )
+
+    async def _get_circle(self, maker_id: str) -> Circle:
+        info = await self._fetch_circle_details(maker_id)
+        if info is None:
             raise DlsiteError(f"Failed to get circle {maker_id}")
-        info = parse_circle_html(html)
         info["maker_id"] = maker_id
         return Circle.from_dict(info)
 
-    async def _fetch_circle_html(self, maker_id: str) -> Optional[str]:
+    async def _fetch_circle_details(self, maker_id: str) -> Optional[dict[str, Any]]:
         url = (
             f"https://www.dlsite.com/maniax/circle/profile"
             f"/=/maker_id/{maker_id}.html"
         )
+        if self._cache is not None:
+            content = await self._cached_read(url)
+            if content is None:
+                return None
+            # same lossy decoding as the streamed path
+            return parse_circle_html(content.decode(errors="replace"))
         async with self.get(url) as response:
             if response.status == 200:
-                return await response.text()
+                return await parse_circle_stream(
+                    response.content.iter_chunked(self._HTML_CHUNK_SIZE)
+                )
         return None
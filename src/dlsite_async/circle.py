@@ -1,10 +1,11 @@
 """DLsite circle classes."""
 from collections.abc import Mapping
-from dataclasses import dataclass, fields
+from dataclasses import dataclass
 from enum import Enum
 from typing import Any
 
 from .exceptions import InvalidIDError
+from .utils import field_names
 
 
 class MakerType(str, Enum):
@@ -27,13 +28,18 @@ class MakerType(str, Enum):
         Raises:
             InvalidIDError: `maker_id` was invalid.
         """
-        if maker_id[:2] == "RG":
-            return MakerType.CIRCLE
-        if maker_id[:2] == "BG":
-            return MakerType.PUBLISHER
-        if maker_id[:2] == "VG":
-            return MakerType.BRAND
-        raise InvalidIDError(f"Invalid maker ID {maker_id}")
+        try:
+            return _MAKER_PREFIX[maker_id[:2]]
+        except KeyError as exc:
+            raise InvalidIDError(f"Invalid maker ID {maker_id}") from exc
+
+
+# maker ID prefix -> maker type
+_MAKER_PREFIX = {
+    "RG": MakerType.CIRCLE,
+    "BG": MakerType.PUBLISHER,
+    "VG": MakerType.BRAND,
+}
 
 
 @dataclass
@@ -51,5 +57,5 @@ class Circle:
     @classmethod
     def from_dict(cls, d: Mapping[str, Any]) -> "Circle":
         """Construct Circle from a dictionary."""
-        names = {f.name for f in fields(cls)}
-        return cls(**{k: v for k, v in d.items() if k in names})
+        names = field_names(cls)
+        return cls(**{k: d[k] for k in names if k in d})
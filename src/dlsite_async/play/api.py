@@ -3,17 +3,23 @@ import asyncio
 import logging
 import math
 import os
-import tempfile
 from datetime import datetime
-from itertools import islice
+from io import BytesIO
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, AsyncIterator, Iterable, Iterator, Mapping, Optional, Union
+from typing import Any, AsyncIterator, Callable, Mapping, Optional, Union
 
 from ..api import BaseAPI
+from ..exceptions import DlsiteError
 from ..work import AgeCategory, Work, WorkType
-from ..utils import fromisoformat
+from ..utils import _HAS_ORJSON, field_names, fromisoformat, json_loads
 from .models import DownloadToken, PlayFile, ZipTree
-from .scramble import descramble as _descramble
+from .scramble import _HAS_PIL, descramble as _descramble
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
 
 
 logger = logging.getLogger(__name__)
@@ -24,11 +30,17 @@ class PlayAPI(BaseAPI["PlayAPI"]):
 
     Args:
         locale: Optional locale. Defaults to ``ja_JP``.
+        dl_concurrency: Maximum number of concurrent file downloads.
     """
 
-    def __init__(self, locale: Optional[str] = None, **kwargs: Any):
+    _WARMUP_URL = "https://play.dlsite.com/"
+
+    def __init__(
+        self, locale: Optional[str] = None, dl_concurrency: int = 8, **kwargs: Any
+    ):
         super().__init__(**kwargs)
         self.locale = locale
+        self._dl_sem = asyncio.Semaphore(dl_concurrency)
 
     async def login(self, *args: Any, **kwargs: Any) -> None:
         """Login to DLsite Play."""
@@ -53,7 +65,7 @@ class PlayAPI(BaseAPI["PlayAPI"]):
         """
         url = "https://play.dl.dlsite.com/api/download/sign/cookie"
         async with self.get(url, params={"workno": workno}) as response:
-            return DownloadToken.from_json(await response.json())
+            return DownloadToken.from_json(await response.json(loads=json_loads))
 
     async def ziptree(self, token: DownloadToken) -> ZipTree:
         """Return ziptree for the specified download.
@@ -65,8 +77,10 @@ class PlayAPI(BaseAPI["PlayAPI"]):
             A new zip tree.
         """
         url = f"{token.url}ziptree.json"
-        async with self.get(url) as response:
-            return ZipTree.from_json(await response.json())
+        content = await self._cached_read(url)
+        if content is None:  # pragma: no cover
+            raise DlsiteError(f"Failed to get ziptree for {token.url}")
+        return ZipTree.from_json(json_loads(content))
 
     async def download_playfile(
         self,
@@ -105,26 +119,91 @@ class PlayAPI(BaseAPI["PlayAPI"]):
             dest.parent.mkdir(parents=True)
         if not force and dest.exists():
             raise FileExistsError(str(dest))
-        async with self.get(url, timeout=self._DL_TIMEOUT) as response:
+        descramble = bool(
+            descramble
+            and playfile.type == "image"
+            and playfile.files["optimized"].get("crypt")
+        )
+        if descramble and not _HAS_PIL:
+            logger.warning(
+                "Image descramble requires installation with dlsite-async[pil]"
+            )
+            descramble = False
+        content: Optional[bytes] = None
+        # download to a predictable partial file next to dest and rename it
+        # into place once complete
+        part = dest.with_name(f"{dest.name}.part")
+        # part file is only opened once a download slot is available so that
+        # waiting downloads do not hold open file descriptors
+        async with self._dl_sem:
             try:
-                with tempfile.NamedTemporaryFile(
-                    prefix=dest.name, dir=dest.parent, delete=False
-                ) as temp:
-                    async for chunk in response.content.iter_chunked(
-                        self._DL_CHUNK_SIZE
-                    ):
-                        temp.write(chunk)
+                async with self.get(url, timeout=self._DL_TIMEOUT) as response:
+                    if descramble:
+                        # scrambled image is decoded straight from memory so
+                        # that only the descrambled image is written to disk
+                        content = await response.read()
+                    else:
+                        with open(part, "wb") as fp:
+                            await self._write_response(response, fp)
+                if content is not None:
+                    with open(part, "wb") as fp:
+                        await asyncio.to_thread(
+                            _descramble, BytesIO(content), playfile, fp
+                        )
             except Exception:
-                temp.close()
-                os.remove(temp)
+                part.unlink(missing_ok=True)
                 raise
-        os.replace(temp.name, dest)
-        if (
-            playfile.type == "image"
-            and playfile.files["optimized"].get("crypt")
-            and descramble
-        ):
-            _descramble(dest, playfile)
+        os.replace(part, dest)
+
+    async def download_playfiles(
+        self,
+        token: DownloadToken,
+        playfiles: Mapping[str, PlayFile],
+        dest_dir: Union[str, Path],
+        mkdir: bool = False,
+        force: bool = False,
+        descramble: bool = False,
+    ) -> None:
+        """Concurrently download playfiles to the specified directory.
+
+        Args:
+            token: A download token returned from `download_token`.
+            playfiles: Mapping of relative destination path to PlayFile (i.e. a
+                `ZipTree`).
+            dest_dir: Destination directory to write the downloaded files.
+            mkdir: Create destination parent directories if they do not already
+                exist.
+            force: Overwrite destination files if they already exist.
+            descramble: Descramble downloaded images (requires optional
+                ``dlsite-async[pil]`` dependency packages).
+
+        Raises:
+            FileExistsError: A destination file already exists.
+
+        Note:
+            The number of simultaneous downloads is limited by the
+            ``dl_concurrency`` PlayAPI argument. All downloads are attempted
+            before the first error (if any) is raised.
+        """
+        if isinstance(dest_dir, str):
+            dest_dir = Path(dest_dir)
+        results = await asyncio.gather(
+            *(
+                self.download_playfile(
+                    token,
+                    playfile,
+                    dest_dir / path,
+                    mkdir=mkdir,
+                    force=force,
+                    descramble=descramble,
+                )
+                for path, playfile in playfiles.items()
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
 
     async def purchases(
         self,
@@ -163,25 +242,50 @@ class PlayAPI(BaseAPI["PlayAPI"]):
         if count < 1:
             return
 
-        async def _get_one(page: int) -> Any:
-            async with self.get(
-                url,
-                params={"_": now, "last": last_, "page": page},
-            ) as response:
-                return await response.json()
-
-        for pages in _batched(range(1, math.ceil(count / page_limit) + 1), concurrency):
-            for coro in asyncio.as_completed(
-                [asyncio.ensure_future(_get_one(page)) for page in pages]
-            ):
-                data = await coro
-                for work in data.get("works", []):
-                    yield _parse_purchase(work, locale=self.locale or "ja_JP")
+        # keep up to `concurrency` page requests in flight at all times rather
+        # than waiting for each batch of pages to complete
+        sem = asyncio.Semaphore(concurrency)
+
+        localized_name = _localized_name_getter(self.locale or "ja_JP")
+
+        async def _get_one(page: int) -> list[tuple[Work, datetime]]:
+            async with sem:
+                async with self.get(
+                    url,
+                    params={"_": now, "last": last_, "page": page},
+                ) as response:
+                    if ijson is not None and not _HAS_ORJSON:
+                        # works are still collected per page, so ijson is only
+                        # used to avoid buffering the whole page when the
+                        # (faster) orjson decoder is not available
+                        return [
+                            _parse_purchase(work, localized_name)
+                            async for work in ijson.items_async(
+                                response.content, "works.item", use_float=True
+                            )
+                        ]
+                    data = await response.json(loads=json_loads)
+            return [
+                _parse_purchase(work, localized_name) for work in data.get("works", [])
+            ]
+
+        tasks = [
+            asyncio.create_task(_get_one(page))
+            for page in range(1, math.ceil(count / page_limit) + 1)
+        ]
+        try:
+            for coro in asyncio.as_completed(tasks):
+                for purchase in await coro:
+                    yield purchase
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
     async def _get_product_count(self, last: int) -> tuple[int, int, int]:
         url = "https://play.dlsite.com/api/product_count"
         async with self.get(url, params={"last": last}) as response:
-            data = await response.json()
+            data = await response.json(loads=json_loads)
         return (
             data.get("user", 0),
             data.get("page_limit", 50),
@@ -189,57 +293,61 @@ class PlayAPI(BaseAPI["PlayAPI"]):
         )
 
 
-def _batched(iterable: Iterable[Any], n: int) -> Iterator[tuple[Any, ...]]:
-    it = iter(iterable)
-    while batch := tuple(islice(it, n)):
-        yield batch
+# purchases API tag class -> Work field
+_TAG_CLASSES = {
+    "created_by": "author",
+    "scenario_by": "scenario",
+    "illust_by": "illustration",
+    "voice_by": "voice_actor",
+    "music_by": "music",
+}
 
 
 def _parse_purchase(
-    d: Mapping[str, Any], locale: str = "ja_JP"
+    d: Mapping[str, Any],
+    localized_name: Callable[[Mapping[str, str]], str] = itemgetter("ja_JP"),
 ) -> tuple[Work, datetime]:
     """Construct Work from purchases API dictionary."""
-    d = dict(d)
-    d["age_category"] = AgeCategory[d["age_category"].upper()]
-    if d.get("author_name"):
-        d["authors"] = [author.strip() for author in d["author_name"].split("/")]
-    d["maker_id"] = d["maker"]["id"]
-    if d["maker_id"].startswith("R"):
-        d["circle"] = _localized_name(d["maker"]["name"])
+    # only copy keys which map directly onto Work fields, everything else is
+    # read from the (much larger) API dictionary as needed
+    names = field_names(Work)
+    w: dict[str, Any] = {k: v for k, v in d.items() if k in names}
+    w["age_category"] = AgeCategory[d["age_category"].upper()]
+    w["maker_id"] = d["maker"]["id"]
+    if w["maker_id"].startswith("R"):
+        w["circle"] = localized_name(d["maker"]["name"])
     else:
-        d["brand"] = _localized_name(d["maker"]["name"])
-    d["work_name"] = _localized_name(d["name"])
+        w["brand"] = localized_name(d["maker"]["name"])
+    w["work_name"] = localized_name(d["name"])
     if d.get("regist_date"):
-        d["regist_date"] = fromisoformat(d["regist_date"])
+        w["regist_date"] = fromisoformat(d["regist_date"])
     sales_date: datetime = fromisoformat(d["sales_date"])
     tags = d.get("tags") or []
     for tag in tags:
-        classes = {
-            "created_by": "author",
-            "scenario_by": "scenario",
-            "illust_by": "illustration",
-            "voice_by": "voice_actor",
-            "music_by": "music",
-        }
-        k = classes.get(tag.get("class"))
+        k = _TAG_CLASSES.get(tag.get("class"))
         if k and tag.get("name"):
-            if k not in d:
-                d[k] = []
-            d[k].append(tag["name"])
+            w.setdefault(k, []).append(tag["name"])
     if d.get("upgrade_date"):
-        d["modified_date"] = fromisoformat(d["upgrade_date"])
+        w["modified_date"] = fromisoformat(d["upgrade_date"])
     for k, v in d.get("work_files", {}).items():
         if k == "main":
-            d["work_image"] = v
+            w["work_image"] = v
         else:
-            if "sample_images" not in d:
-                d["sample_images"] = []
-            d["sample_images"].append(v)
+            if "sample_images" not in w:
+                w["sample_images"] = []
+            w["sample_images"].append(v)
     if d.get("work_type"):
-        d["work_type"] = WorkType(d["work_type"])
-    d["product_id"] = d["workno"]
-    return Work.from_dict(d), sales_date
+        w["work_type"] = WorkType(d["work_type"])
+    w["product_id"] = d["workno"]
+    return Work(**w), sales_date
+
+
+def _localized_name_getter(locale: str) -> Callable[[Mapping[str, str]], str]:
+    """Return purchases API name lookup for `locale` (falls back to ``ja_JP``)."""
+    if locale == "ja_JP":
+        return itemgetter("ja_JP")
 
+    def _localized_name(d: Mapping[str, str]) -> str:
+        return d.get(locale) or d["ja_JP"]
 
-def _localized_name(d: Mapping[str, str], locale: str = "ja_JP") -> str:
-    return d.get(locale, d["ja_JP"])
+    return _localized_name
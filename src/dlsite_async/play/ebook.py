@@ -1,19 +1,27 @@
 """DLsite Play ebook viewer."""
+import asyncio
 import os
-import importlib.util
 import logging
-import tempfile
 from base64 import b64encode, b64decode
 from contextlib import AbstractAsyncContextManager
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Literal, Optional, Union, cast
+from typing import TYPE_CHECKING, Any, Iterable, Literal, Optional, Union, cast
 
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
 from cryptography.hazmat.primitives import hashes, serialization
 
 from ..exceptions import DlsiteError
+from ..utils import json_loads
 from .models import PlayFile, ViewerToken, ZipTree
 
+
+try:
+    from PIL import Image
+
+    _HAS_PIL = True
+except ImportError:  # pragma: no cover
+    _HAS_PIL = False
+
 if TYPE_CHECKING:
     from .api import PlayAPI
 
@@ -48,6 +56,8 @@ class EbookSession(AbstractAsyncContextManager["EbookSession"]):
         if not self.playfile.is_ebook:
             raise ValueError("Unsupported ebook type: {self.playfile.type}")
         self._token: Optional[ViewerToken] = None
+        self._private_key: Optional[rsa.RSAPrivateKey] = None
+        self._key_stream = b""
         self._meta: dict[str, Any] = {}
 
     @property
@@ -83,19 +93,29 @@ class EbookSession(AbstractAsyncContextManager["EbookSession"]):
     async def load(self) -> None:
         if self._token is None:
             self._token = await self._download_token()
+            # blocks may overrun _DL_CHUNK_SIZE by up to one received chunk
+            self._key_stream = _key_stream(
+                self._token.key, 2 * self._play._DL_CHUNK_SIZE
+            )
         if not self._meta:
             self._meta.update(await self._download_meta())
 
     async def close(self) -> None:
         self._token = None
+        self._key_stream = b""
         self._meta = {}
 
     async def _download_token(self) -> ViewerToken:
         """Return a download token for this ebook."""
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=4096,
-        )
+        if self._private_key is None:
+            # 4096-bit key generation takes a significant amount of CPU time, run
+            # it in a worker thread and reuse the key for this session
+            self._private_key = await asyncio.to_thread(
+                rsa.generate_private_key,
+                public_exponent=65537,
+                key_size=4096,
+            )
+        private_key = self._private_key
         payload = {
             "play_type": "ebook_fixed",
             "revision": self.ziptree.revision or "",
@@ -108,19 +128,20 @@ class EbookSession(AbstractAsyncContextManager["EbookSession"]):
         }
         url = f"https://play.dlsite.com/api/v2/viewer/token/{self.workno}"
         async with self._play.post(url, json=payload) as response:
-            data = await response.json()
-            ciphertext = b64decode(data["key"])
-            plaintext = private_key.decrypt(
-                ciphertext,
-                padding.OAEP(
-                    mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                    algorithm=hashes.SHA256(),
-                    label=None,
-                ),
-            )
-            data["key"] = bytes.fromhex(plaintext.decode())
-            data["v"] = self.ziptree.revision or ""
-            return ViewerToken.from_json(data)
+            data = await response.json(loads=json_loads)
+        ciphertext = b64decode(data["key"])
+        plaintext = await asyncio.to_thread(
+            private_key.decrypt,
+            ciphertext,
+            padding.OAEP(
+                mgf=padding.MGF1(algorithm=hashes.SHA256()),
+                algorithm=hashes.SHA256(),
+                label=None,
+            ),
+        )
+        data["key"] = bytes.fromhex(plaintext.decode())
+        data["v"] = self.ziptree.revision or ""
+        return ViewerToken.from_json(data)
 
     async def _download_meta(self) -> dict[str, Any]:
         """Return viewer metadata for this ebook."""
@@ -128,7 +149,7 @@ class EbookSession(AbstractAsyncContextManager["EbookSession"]):
             raise DlsiteError("Ebook session has not been loaded")
         url = f"{self._token.prefix}/{self.playfile.hashname}/viewer-meta.json"
         async with self._play.get(url, params=self._token.params) as response:
-            return cast(dict[str, Any], await response.json())
+            return cast(dict[str, Any], await response.json(loads=json_loads))
 
     async def download_page(
         self,
@@ -165,7 +186,7 @@ class EbookSession(AbstractAsyncContextManager["EbookSession"]):
         url = f"{self._token.prefix}/{self.playfile.hashname}/{src}"
 
         if convert:
-            if importlib.util.find_spec("PIL.Image") is not None:
+            if _HAS_PIL:
                 ext: str = convert
             else:
                 logger.warn(
@@ -180,38 +201,128 @@ class EbookSession(AbstractAsyncContextManager["EbookSession"]):
             dest.parent.mkdir(parents=True)
         if not force and dest.exists():
             raise FileExistsError(str(dest))
-        async with self._play.get(
-            url, params=self._token.params, timeout=self._play._DL_TIMEOUT
-        ) as response:
-            with tempfile.NamedTemporaryFile(
-                prefix=dest.stem, suffix=".webp", dir=dest.parent, delete=False
-            ) as temp:
-                try:
+        # download to a predictable partial file next to dest and rename it
+        # into place once complete
+        part = dest.with_name(f"{dest.name}.part")
+        try:
+            # part file is only opened once a download slot is available so
+            # that waiting downloads do not hold open file descriptors
+            async with self._play._dl_sem, self._play.get(
+                url, params=self._token.params, timeout=self._play._DL_TIMEOUT
+            ) as response:
+                with open(part, "wb") as fp:
+                    # buffer encrypted content into _DL_CHUNK_SIZE blocks, then
+                    # decrypt each block at once and run blocking writes in a
+                    # worker thread
+                    await asyncio.to_thread(self._play._preallocate, response, fp)
+                    key = self._token.key
+                    buf = bytearray()
                     offset = 0
-                    async for chunk in response.content.iter_chunked(
-                        self._play._DL_CHUNK_SIZE
-                    ):
-                        temp.write(
-                            bytes(
-                                chunk[i]
-                                ^ self._token.key[(offset + i) % len(self._token.key)]
-                                for i in range(len(chunk))
-                            )
-                        )
-                        offset += len(chunk)
-                except Exception:
-                    temp.close()
-                    os.remove(temp.name)
-                    raise
-        if convert:
-            _convert(temp.name, dest)
-            os.remove(temp.name)
-        else:
-            os.replace(temp.name, dest)
+                    while True:
+                        chunk = await response.content.read(self._play._READ_BUFSIZE)
+                        if not chunk:
+                            break
+                        buf += chunk
+                        if len(buf) >= self._play._DL_CHUNK_SIZE:
+                            data = _xor(buf, key, offset, self._key_stream)
+                            await asyncio.to_thread(fp.write, data)
+                            offset += len(buf)
+                            buf = bytearray()
+                    if buf:
+                        data = _xor(buf, key, offset, self._key_stream)
+                        await asyncio.to_thread(fp.write, data)
+            if convert:
+                await asyncio.to_thread(_convert, part, dest)
+                part.unlink()
+            else:
+                os.replace(part, dest)
+        except Exception:
+            part.unlink(missing_ok=True)
+            raise
 
+    async def download_pages(
+        self,
+        dest_dir: Union[str, Path],
+        indices: Optional[Iterable[int]] = None,
+        mkdir: bool = False,
+        convert: Optional[Literal["jpg", "png"]] = None,
+        force: bool = False,
+    ) -> None:
+        """Concurrently download ebook pages to the specified location.
+
+        Args:
+            dest_dir: Destination directory to write the downloaded files.
+            indices: Zero-indexed page numbers to download. Defaults to all pages.
+            mkdir: Create ``dest_dir`` and parent directories if they do not already
+                exist.
+            convert: Convert downloaded images to the specified format (see
+                `download_page`).
+            force: Overwrite existing destination files if they already exist.
+
+        Raises:
+            FileExistsError: A destination file already exists.
+
+        Note:
+            The number of simultaneous downloads is limited by the
+            ``dl_concurrency`` PlayAPI argument. All downloads are attempted
+            before the first error (if any) is raised.
+        """
+        if indices is None:
+            indices = range(len(self._pages))
+        results = await asyncio.gather(
+            *(
+                self.download_page(
+                    index, dest_dir, mkdir=mkdir, convert=convert, force=force
+                )
+                for index in indices
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
 
-def _convert(src: Union[str, Path], dest: Union[str, Path]) -> None:
-    from PIL import Image
 
+def _key_stream(key: bytes, length: int) -> bytes:
+    """Return repeated key stream which covers `length` bytes from any offset."""
+    return key * (length // len(key) + 2)
+
+
+def _xor(
+    data: Union[bytes, bytearray],
+    key: bytes,
+    offset: int = 0,
+    stream: Optional[bytes] = None,
+) -> bytes:
+    """XOR data with a repeating key stream.
+
+    Args:
+        data: Data to XOR.
+        key: Key.
+        offset: Position of ``data[0]`` in the key stream.
+        stream: Optional precomputed ``_key_stream(key, ...)``. Rebuilt if it is
+            too short for ``data``.
+
+    Returns:
+        XOR'd data.
+    """
+    n = len(data)
+    start = offset % len(key)
+    if stream is None or len(stream) < start + n:
+        stream = _key_stream(key, n)
+    pad = memoryview(stream)[start : start + n]
+    # XOR as (arbitrary size) ints so that the work is done in C rather than one
+    # Python operation per byte
+    return (int.from_bytes(data, "little") ^ int.from_bytes(pad, "little")).to_bytes(
+        n, "little"
+    )
+
+
+def _convert(src: Union[str, Path], dest: Union[str, Path]) -> None:
     with Image.open(src) as im:
-        im.save(dest)
+        if Path(dest).suffix.lower() in (".jpg", ".jpeg"):
+            # explicit (fast) encoder options, Pillow wheels already use
+            # libjpeg-turbo
+            im.save(dest, quality=90, optimize=False, progressive=False)
+        else:
+            im.save(dest)
@@ -1,19 +1,32 @@
 """Play API response models."""
+import sys
 from abc import ABC
 from collections.abc import Mapping
-from dataclasses import dataclass, fields
+from dataclasses import dataclass, field
 from datetime import datetime
-from functools import cached_property
-from typing import Any, Iterable, Iterator, Optional, Type, TypeVar, Union, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
 from ..exceptions import DlsiteError
-from ..utils import fromisoformat
+from ..utils import field_names, fromisoformat, parse_timestamp
 
 
 _PM = TypeVar("_PM", bound="_PlayModel")
+_EBOOK_TYPES = frozenset(("ebook_fixed", "ebook_webtoon"))
+_SIZE_PREFIXES = ("", "K", "M", "G")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class _PlayModel(ABC):  # noqa: B024
     """Play API model."""
 
@@ -27,16 +40,20 @@ class _PlayModel(ABC):  # noqa: B024
         Returns:
             A new model.
         """
-        names = {f.name for f in fields(cls)}
-        return cls(**{k: v for k, v in data.items() if k in names})
+        names = field_names(cls)
+        return cls(**{k: data[k] for k in names if k in data})
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DownloadToken(_PlayModel):
     """Play API download token."""
 
     expires_at: datetime
     url: str
+    _expiration: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_expiration", int(self.expires_at.timestamp()))
 
     @classmethod
     def from_json(cls, data: dict[str, Any]) -> "DownloadToken":
@@ -53,17 +70,19 @@ class DownloadToken(_PlayModel):
         """
         try:
             data["expires_at"] = fromisoformat(data["expires"])
-            return super().from_json(data)
+            # slots=True dataclasses are recreated, zero-arg super() would refer
+            # to the original class
+            return super(DownloadToken, cls).from_json(data)
         except KeyError as e:  # pragma: no cover
             raise DlsiteError("Got unexpected download_token data.") from e
 
     @property
     def expiration(self) -> int:
         """Return expiration as POSIX timestamp."""
-        return int(self.expires_at.timestamp())
+        return self._expiration
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PlayFile(_PlayModel):
     """DLsite Play play-able file."""
 
@@ -72,18 +91,24 @@ class PlayFile(_PlayModel):
     files: dict[str, Any]
     hashname: str
 
-    def __post_init__(self) -> None:
-        object.__setattr__(self, self.type, self.files)
+    if not TYPE_CHECKING:
+        # hidden from type checkers so that attribute typos are still reported
+
+        def __getattr__(self, name: str) -> Any:
+            # files are also accessible by type name (i.e. ``playfile.image``)
+            if name != "type" and name == self.type:
+                return self.files
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
 
     @property
     def size(self) -> str:
         """Return length as human readable size."""
-        length = float(self.length)
-        for prefix in ("", "K", "M"):
-            if abs(length) < 1024.0:
-                return f"{length:3.1f}{prefix}B"
-            length /= 1024.0
-        return f"{length:.1f}GB"
+        # bit length gives the 1024-based magnitude directly
+        idx = min((self.length.bit_length() - 1) // 10, 3) if self.length else 0
+        length = self.length / (1 << (10 * idx))
+        return f"{length:.1f}{_SIZE_PREFIXES[idx]}B"
 
     @property
     def optimized_name(self) -> str:
@@ -107,7 +132,7 @@ class PlayFile(_PlayModel):
 
     @property
     def is_ebook(self) -> bool:
-        return self.type in {"ebook_fixed", "ebook_webtoon"}
+        return self.type in _EBOOK_TYPES
 
     @classmethod
     def from_json(
@@ -123,12 +148,13 @@ class PlayFile(_PlayModel):
         Returns:
             A new PlayFile.
         """
-        type_ = data["type"]
+        # a ziptree holds one PlayFile per file but only a handful of types
+        type_ = sys.intern(data["type"])
         files = data.get(type_, {})
-        return cls(data["length"], data["type"], files, hashname=hashname or "")
+        return cls(data["length"], type_, files, hashname=hashname or "")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class _TreeFile(_PlayModel):
     """ZipTree tree file entry."""
 
@@ -136,12 +162,12 @@ class _TreeFile(_PlayModel):
     name: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class _HiddenFile(_TreeFile):
     "ZipTree hidden file entry." ""
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class _TreeFolder(_PlayModel):
     """ZipTree tree folder entry."""
 
@@ -166,19 +192,22 @@ class _TreeFolder(_PlayModel):
 _TreeEntry = Union[_TreeFile, _TreeFolder, _HiddenFile]
 
 
+# ziptree entry type -> entry constructor
+_TREE_CTORS: dict[str, Callable[[dict[str, Any]], _TreeEntry]] = {
+    "file": _TreeFile.from_json,
+    "folder": _TreeFolder.from_json,
+    "hidden": _HiddenFile.from_json,
+}
+
+
 def _tree_entry(data: dict[str, Any]) -> _TreeEntry:
-    if data["type"] == "file":
-        return _TreeFile.from_json(data)
-    if data["type"] == "folder":
-        return _TreeFolder.from_json(data)
-    if data["type"] == "hidden":
-        return _HiddenFile.from_json(data)
-    raise DlsiteError(  # pragma: no cover
-        f"Unsupported ziptree entry type: {data['type']}"
-    )
+    ctor = _TREE_CTORS.get(data["type"])
+    if ctor is None:  # pragma: no cover
+        raise DlsiteError(f"Unsupported ziptree entry type: {data['type']}")
+    return ctor(data)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ZipTree(_PlayModel, Mapping[str, PlayFile]):
     """Play API zip tree.
 
@@ -196,6 +225,14 @@ class ZipTree(_PlayModel, Mapping[str, PlayFile]):
     version: Optional[str] = None
     revision: Optional[str] = None
     updated_at: Optional[datetime] = None
+    _dict: dict[str, PlayFile] = field(
+        init=False, repr=False, compare=False, hash=False
+    )
+
+    def __post_init__(self) -> None:
+        # build path lookup eagerly, frozen dataclass cached_property would need
+        # to go through instance __dict__ on every access
+        object.__setattr__(self, "_dict", dict(self._walk(self.tree)))
 
     @classmethod
     def from_json(cls, data: dict[str, Any]) -> "ZipTree":
@@ -220,9 +257,7 @@ class ZipTree(_PlayModel, Mapping[str, PlayFile]):
         except KeyError as e:  # pragma: no cover
             raise DlsiteError("Got unexpected ZipTree data.") from e
         if "updated_at" in data:
-            updated_at: Optional[datetime] = datetime.strptime(
-                data["updated_at"], "%Y-%m-%d %H:%M:%S"
-            )
+            updated_at: Optional[datetime] = parse_timestamp(data["updated_at"])
         else:
             updated_at = None
         return cls(
@@ -235,21 +270,23 @@ class ZipTree(_PlayModel, Mapping[str, PlayFile]):
             updated_at=updated_at,
         )
 
-    @cached_property
-    def _dict(self) -> dict[str, PlayFile]:
-        return {path: playfile for path, playfile in self._walk(self.tree)}
-
-    def _walk(
-        self, entries: Iterable[_TreeEntry], parent: Optional[str] = None
-    ) -> Iterator[tuple[str, PlayFile]]:
-        for entry in entries:
-            if isinstance(entry, _TreeFile):
-                path = "/".join([parent, entry.name]) if parent else entry.name
-                playfile = self.playfile.get(entry.hashname)
-                if playfile is not None:  # pragma: no cover
-                    yield path, playfile
-            elif isinstance(entry, _TreeFolder):
-                yield from self._walk(entry.children, entry.path)
+    def _walk(self, entries: Iterable[_TreeEntry]) -> Iterator[tuple[str, PlayFile]]:
+        # explicit stack instead of recursive yield from, so deeply nested
+        # entries are not re-yielded through every ancestor generator
+        stack: list[tuple[Iterator[_TreeEntry], str]] = [(iter(entries), "")]
+        while stack:
+            it, prefix = stack[-1]
+            for entry in it:
+                if isinstance(entry, _TreeFile):
+                    playfile = self.playfile.get(entry.hashname)
+                    if playfile is not None:  # pragma: no cover
+                        yield prefix + entry.name, playfile
+                elif isinstance(entry, _TreeFolder):
+                    folder_prefix = f"{entry.path}/" if entry.path else ""
+                    stack.append((iter(entry.children), folder_prefix))
+                    break
+            else:
+                stack.pop()
 
     def __getitem__(self, key: Any) -> PlayFile:
         return self._dict.__getitem__(key)
@@ -261,7 +298,7 @@ class ZipTree(_PlayModel, Mapping[str, PlayFile]):
         return iter(self._dict)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ViewerToken(_PlayModel):
     """Ebook Viewer API download token."""
 
@@ -304,6 +341,6 @@ class ViewerToken(_PlayModel):
             data["policy"] = parameters["Policy"]
             data["signature"] = parameters["Signature"]
             data["d"] = parameters["d"]
-            return super().from_json(data)
+            return super(ViewerToken, cls).from_json(data)
         except KeyError as e:  # pragma: no cover
             raise DlsiteError("Got unexpected download_token data.") from e
@@ -10,13 +10,21 @@ image viewer ``main.js``).
 """
 import logging
 import math
+from functools import lru_cache
 from pathlib import Path
 from random import Random
-from typing import Any, Union
+from typing import IO, Any, Optional, Union
 
 from .models import PlayFile
 
 
+try:
+    from PIL import Image
+
+    _HAS_PIL = True
+except ImportError:  # pragma: no cover
+    _HAS_PIL = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,70 +53,75 @@ def _mt_tiles(seed: int, length: int) -> list[int]:
     if length > 624:  # pragma: no cover
         raise ValueError
     rs = _MTRandom(seed)
+    # dlsite's MT implementation only advances one 32-bit output per call, but
+    # Python random() consumes two, so call i uses outputs i and i + 1. Draw the
+    # raw outputs once rather than rewinding the generator state after each call.
+    out = [rs.getrandbits(32) for _ in range(length + 1)]
     a = list(range(length))
-    pos = 0
-    for n in range(length - 1, -1, -1):
-        e = math.floor(rs.random() * (n + 1))
-        r = a[n]
-        a[n] = a[e]
-        a[e] = r
-
-        # (partially) adjust for dlsite's MT implementation
-        #
-        # we don't care about accounting for the MT array twist because
-        # we will never actually have >624 iterations
-        pos += 1
-        version, state, next_gauss = rs.getstate()
-        state = state[:-1] + (pos,)
-        rs.setstate((version, state, next_gauss))
+    for i, n in enumerate(range(length - 1, -1, -1)):
+        # same 53-bit float construction as Python random()
+        r = ((out[i] >> 5) * 67108864 + (out[i + 1] >> 6)) * (1.0 / 9007199254740992.0)
+        e = math.floor(r * (n + 1))
+        a[n], a[e] = a[e], a[n]
     return a
 
 
-def descramble(path: Union[str, Path], playfile: PlayFile) -> None:
+@lru_cache(maxsize=32)
+def _tile_boxes(
+    tiles_w: int, tiles_h: int, tile_w: int
+) -> tuple[tuple[int, int, int, int], ...]:
+    """Return row-major tile grid crop boxes."""
+    return tuple(
+        (x * tile_w, y * tile_w, (x + 1) * tile_w, (y + 1) * tile_w)
+        for y in range(tiles_h)
+        for x in range(tiles_w)
+    )
+
+
+def descramble(
+    path: Union[str, Path, IO[bytes]],
+    playfile: PlayFile,
+    dest: Optional[Union[str, Path, IO[bytes]]] = None,
+) -> None:
     """Descramble the specified image file.
 
     Args:
-        path: Image file path.
+        path: Image file path (or file object).
         playfile: Original image PlayFile.
+        dest: Descrambled image file path (or file object). Defaults to
+            overwriting `path`.
     """
-    try:
-        from PIL import Image
-    except ImportError:  # pragma: no cover
+    if not _HAS_PIL:  # pragma: no cover
         logger.warn("Image descramble requires installation with dlsite-async[pil]")
         return
 
-    with Image.open(path) as im:
-        tile_w = 128
-        optimized = playfile.files["optimized"]
-        width = optimized["width"]
-        height = optimized["height"]
-        tiles_w = math.ceil(width / tile_w)
-        tiles_h = math.ceil(height / tile_w)
-        tiles = [
-            im.crop(
-                (
-                    x * tile_w,
-                    y * tile_w,
-                    (x + 1) * tile_w,
-                    (y + 1) * tile_w,
-                )
-            )
-            for y in range(tiles_h)
-            for x in range(tiles_w)
-        ]
-        new_im = im.copy()
-
+    tile_w = 128
+    optimized = playfile.files["optimized"]
+    width = optimized["width"]
+    height = optimized["height"]
+    tiles_w = math.ceil(width / tile_w)
+    tiles_h = math.ceil(height / tile_w)
     seed = int(playfile.optimized_name[5:12], 16)
-    shuffle = {}
-    # tile order is reverse mapping MT prng output {<val>: index}
-    for v, k in enumerate(_mt_tiles(seed, len(tiles))):
-        shuffle[k] = v
-    for i in range(len(tiles)):
-        tile = tiles[shuffle[i]]
-        x = i % tiles_w
-        y = i // tiles_w
-        new_im.paste(tile, (x * tile_w, y * tile_w))
-    # crop to actual image dimensions
-    # (scrambled image is padded to align to 128 pixel tile boundary)
-    new_im.crop((0, 0, width, height))
-    new_im.save(path)
+    # tile order is reverse mapping of MT prng output, order[i] is the scrambled
+    # (source) tile index for descrambled (destination) tile i
+    order = [0] * (tiles_w * tiles_h)
+    for v, k in enumerate(_mt_tiles(seed, len(order))):
+        order[k] = v
+
+    with Image.open(path) as im:
+        # paste into a new image with the actual image dimensions rather than
+        # copying the (padded) scrambled image
+        # (scrambled image is padded to align to 128 pixel tile boundary)
+        new_im = Image.new(im.mode, (width, height))
+        new_im.info.update(im.info)
+        if im.palette:
+            # Image.new does not copy the source palette (P/PA mode images)
+            palette = im.getpalette(im.palette.mode)
+            if palette is not None:
+                new_im.putpalette(palette, im.palette.mode)
+        boxes = _tile_boxes(tiles_w, tiles_h, tile_w)
+        for box, j in zip(boxes, order):
+            new_im.paste(im.crop(boxes[j]), box[:2])
+    if dest is None:
+        dest = path
+    new_im.save(dest, format=im.format)
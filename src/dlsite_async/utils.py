@@ -1,12 +1,32 @@
 """Utilities."""
+import json
 import re
-from datetime import datetime
+from dataclasses import fields
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Callable, Optional, Union
 
 from .exceptions import InvalidIDError
 
 
+json_loads: Callable[[Union[str, bytes]], Any]
+try:
+    from orjson import loads as json_loads
+
+    _HAS_ORJSON = True
+except ImportError:  # pragma: no cover
+    json_loads = json.loads
+    _HAS_ORJSON = False
+
+
 _PRODUCT_RE = re.compile(r"(?<!\w)[BRV]J\d+", flags=re.IGNORECASE)
 _MAKER_RE = re.compile(r"(?<!\w)[BRV]G\d+", flags=re.IGNORECASE)
+_ID_RE = re.compile(r"(?<!\w)[BRV][JG]\d+", flags=re.IGNORECASE)
+
+
+def _upper(s: str) -> str:
+    # IDs are usually already uppercase, avoid allocating a new string
+    return s if s.isupper() else s.upper()
 
 
 def find_product_id(s: str) -> str:
@@ -23,7 +43,7 @@ def find_product_id(s: str) -> str:
     """
     m = _PRODUCT_RE.search(s)
     if m:
-        return m.group().upper()
+        return _upper(m.group())
     raise InvalidIDError(f"No DLsite product ID in string: {s}")
 
 
@@ -41,18 +61,136 @@ def find_maker_id(s: str) -> str:
     """
     m = _MAKER_RE.search(s)
     if m:
-        return m.group().upper()
+        return _upper(m.group())
     raise InvalidIDError(f"No DLsite maker ID in string: {s}")
 
 
+def find_ids(s: str) -> tuple[Optional[str], Optional[str]]:
+    """Find the first DLsite product ID and maker ID in a string.
+
+    The string is only scanned once.
+
+    Arguments:
+        s: String containing product and/or maker IDs.
+
+    Returns:
+        Tuple of the form (product_id, maker_id). IDs which were not found are
+        ``None``.
+    """
+    product_id: Optional[str] = None
+    maker_id: Optional[str] = None
+    for m in _ID_RE.finditer(s):
+        id_ = _upper(m.group())
+        if id_[1] == "J":
+            if product_id is None:
+                product_id = id_
+        elif maker_id is None:
+            maker_id = id_
+        if product_id and maker_id:
+            break
+    return product_id, maker_id
+
+
+def _field_names(cls: type) -> frozenset[str]:
+    """Return the set of dataclass ``__init__`` field names for `cls`.
+
+    Arguments:
+        cls: Dataclass type.
+
+    Returns:
+        Field names.
+    """
+    return frozenset(f.name for f in fields(cls) if f.init)
+
+
+# non-frozen dataclass types are hashable, but mypy sees them as unhashable
+field_names: Callable[[type], frozenset[str]] = lru_cache(maxsize=None)(_field_names)
+
+
+_ISO_RE = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?"
+    r"(?:(Z)|([+-])(\d{2}):?(\d{2}))?"
+)
+
+
+def parse_timestamp(timestamp: str) -> datetime:
+    """Parse a naive ``YYYY-MM-DD HH:MM:SS`` timestamp.
+
+    Equivalent to ``datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")`` without
+    the per-call format parsing overhead.
+
+    Arguments:
+        timestamp: Timestamp string.
+
+    Returns:
+        Parsed datetime.
+
+    Raises:
+        ValueError: `timestamp` was invalid.
+    """
+    s = timestamp
+    if (
+        len(s) != 19
+        or s[4] != "-"
+        or s[7] != "-"
+        or s[10] not in " T"
+        or s[13] != ":"
+        or s[16] != ":"
+        or not (s[:4] + s[5:7] + s[8:10] + s[11:13] + s[14:16] + s[17:]).isdigit()
+    ):
+        raise ValueError(f"Invalid timestamp: {timestamp}")
+    return datetime(
+        int(s[0:4]),
+        int(s[5:7]),
+        int(s[8:10]),
+        int(s[11:13]),
+        int(s[14:16]),
+        int(s[17:19]),
+    )
+
+
 def fromisoformat(timestamp: str) -> datetime:
+    """Parse a DLsite Play API timestamp.
+
+    Arguments:
+        timestamp: ISO 8601 timestamp.
+
+    Returns:
+        Parsed datetime.
+
+    Raises:
+        ValueError: `timestamp` was invalid.
+    """
+    # Python < 3.11 fromisoformat does not accept a Z (UTC) suffix
+    if timestamp.endswith("Z"):
+        try:
+            return datetime.fromisoformat(f"{timestamp[:-1]}+00:00")
+        except ValueError:
+            pass
     try:
         return datetime.fromisoformat(timestamp)
     except ValueError:
         pass
-    for pattern in ("%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%S.%f%z"):
-        try:
-            return datetime.strptime(timestamp, pattern)
-        except ValueError:
-            pass
-    raise ValueError
+    # fractional seconds which are not 3 or 6 digits, UTC offsets without ":"
+    m = _ISO_RE.fullmatch(timestamp)
+    if m is None:
+        raise ValueError(f"Invalid timestamp: {timestamp}")
+    year, month, day, hour, minute, second, frac, utc, sign, tz_h, tz_m = m.groups()
+    tz: Optional[timezone]
+    if utc:
+        tz = timezone.utc
+    elif sign is None:
+        tz = None
+    else:
+        offset = timedelta(hours=int(tz_h), minutes=int(tz_m))
+        tz = timezone(-offset if sign == "-" else offset)
+    return datetime(
+        int(year),
+        int(month),
+        int(day),
+        int(hour),
+        int(minute),
+        int(second),
+        int(frac.ljust(6, "0")) if frac else 0,
+        tzinfo=tz,
+    )
@@ -1,10 +1,12 @@
 """DLsite work classes."""
 from collections.abc import Mapping
-from dataclasses import dataclass, fields
+from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum, IntEnum
 from typing import Any, Optional
 
+from .utils import field_names
+
 
 class AgeCategory(IntEnum):
     """Work age rating."""
@@ -52,7 +54,7 @@ class WorkType(str, Enum):
     WEBTOON = "WBT"
 
 
-@dataclass
+@dataclass(slots=True)
 class Work:
     """DLsite work (product) class."""
 
@@ -90,8 +92,8 @@ class Work:
     @classmethod
     def from_dict(cls, d: Mapping[str, Any]) -> "Work":
         """Construct Work from a dictionary."""
-        names = {f.name for f in fields(cls)}
-        return cls(**{k: v for k, v in d.items() if k in names})
+        names = field_names(cls)
+        return cls(**{k: d[k] for k in names if k in d})
 
     @property
     def release_date(self) -> Optional[datetime]:
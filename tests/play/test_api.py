@@ -1,10 +1,20 @@
 """DLsite Play API tests."""
+import asyncio
+import json
+import os
 import re
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
 
+import pytest
+from aiohttp import ClientResponseError
 from aioresponses import aioresponses
+from PIL import Image
+from pytest_mock import MockerFixture
 
-from dlsite_async.play.api import PlayAPI
+from dlsite_async.play.api import PlayAPI, _localized_name_getter, _parse_purchase
+from dlsite_async.work import AgeCategory, Work, WorkType
 from dlsite_async.play.models import (
     DownloadToken,
     PlayFile,
@@ -12,6 +22,7 @@ from dlsite_async.play.models import (
     _TreeFile,
     _TreeFolder,
 )
+from dlsite_async.play.scramble import descramble
 
 
 _URL_PATTERN = re.compile(r"^https://play(\.dl)?\.dlsite\.com")
@@ -95,6 +106,42 @@ _TEST_PLAYFILE = PlayFile(
     },
     hashname="123456abcdef.jpg",
 )
+_TEST_PURCHASE_JSON = {
+    "workno": _TEST_WORKNO,
+    "site_id": "maniax",
+    "age_category": "r18",
+    "work_type": "SOU",
+    "maker": {"id": "RG1234", "name": {"ja_JP": "テストサークル"}},
+    "name": {"ja_JP": "テスト作品", "en_US": "Test Work"},
+    "author_name": "Test Author",
+    "regist_date": "2022-01-01T00:00:00.000000Z",
+    "sales_date": "2022-09-01T12:00:00.000000Z",
+    "upgrade_date": "2022-02-01T00:00:00.000000Z",
+    "tags": [
+        {"class": "voice_by", "name": "Test Seiyuu 1"},
+        {"class": "voice_by", "name": "Test Seiyuu 2"},
+        {"class": "genre", "name": "Test Genre"},
+    ],
+    "work_files": {
+        "main": "https://img.dlsite.jp/main.jpg",
+        "sam": "https://img.dlsite.jp/sam.jpg",
+    },
+}
+_TEST_PURCHASE_WORK = Work(
+    product_id=_TEST_WORKNO,
+    site_id="maniax",
+    maker_id="RG1234",
+    work_name="テスト作品",
+    age_category=AgeCategory.R18,
+    circle="テストサークル",
+    work_image="https://img.dlsite.jp/main.jpg",
+    regist_date=datetime(2022, 1, 1, tzinfo=timezone.utc),
+    work_type=WorkType.VOICE_ASMR,
+    modified_date=datetime(2022, 2, 1, tzinfo=timezone.utc),
+    voice_actor=["Test Seiyuu 1", "Test Seiyuu 2"],
+    sample_images=["https://img.dlsite.jp/sam.jpg"],
+)
+_TEST_PURCHASE_DATE = datetime(2022, 9, 1, 12, tzinfo=timezone.utc)
 _TEST_ZIPTREE = ZipTree(
     hash="123456abcdef",
     playfile={"123456abcdef.jpg": _TEST_PLAYFILE},
@@ -126,6 +173,9 @@ async def test_playfile() -> None:
     assert playfile.size == "1.2KB"
     assert playfile.optimized_name == "optimized.jpg"
     assert playfile.optimized_length == 123
+    assert playfile.image is playfile.files  # type: ignore[attr-defined]
+    with pytest.raises(AttributeError):
+        playfile.ebook_fixed  # type: ignore[attr-defined]
 
 
 async def test_download_token(play_api: PlayAPI) -> None:
@@ -135,7 +185,9 @@ async def test_download_token(play_api: PlayAPI) -> None:
             _URL_PATTERN,
             payload=_TEST_DOWNLOAD_TOKEN_JSON,
         )
-        assert _TEST_DOWNLOAD_TOKEN == await play_api.download_token(_TEST_WORKNO)
+        token = await play_api.download_token(_TEST_WORKNO)
+        assert _TEST_DOWNLOAD_TOKEN == token
+        assert 1664008921 == token.expiration
 
 
 async def test_ziptree(play_api: PlayAPI) -> None:
@@ -149,3 +201,250 @@ async def test_ziptree(play_api: PlayAPI) -> None:
         ziptree = await play_api.ziptree(token)
         assert _TEST_ZIPTREE == ziptree
         assert {"foo/bar/baz.jpg": _TEST_PLAYFILE} == ziptree._dict
+
+
+@pytest.mark.parametrize(
+    "length, expected",
+    [
+        (0, "0.0B"),
+        (1023, "1023.0B"),
+        (1024, "1.0KB"),
+        (1024**2 - 1, "1024.0KB"),
+        (5 * 1024**2, "5.0MB"),
+        (3 * 1024**3, "3.0GB"),
+        (2048 * 1024**3, "2048.0GB"),
+    ],
+)
+def test_playfile_size(length: int, expected: str) -> None:
+    """Length should be formatted with a binary size prefix."""
+    assert expected == PlayFile(length, "image", {}, "").size
+
+
+async def test_ziptree_cached(tmp_path: Path) -> None:
+    """Cached ziptree should be returned without a request."""
+    async with PlayAPI(cache_dir=tmp_path) as play_api:
+        with aioresponses() as m:
+            m.get(_URL_PATTERN, payload=_TEST_ZIPTREE_JSON)
+            ziptree = await play_api.ziptree(_TEST_DOWNLOAD_TOKEN)
+            assert ziptree == await play_api.ziptree(_TEST_DOWNLOAD_TOKEN)
+            assert sum(len(calls) for calls in m.requests.values()) == 1
+        assert _TEST_ZIPTREE == ziptree
+
+
+def test_ziptree_walk() -> None:
+    """Files should be found before, inside and after nested folders."""
+    playfile = {
+        name: PlayFile(length=1, type="image", files={}, hashname=name)
+        for name in ("a", "b", "c", "d")
+    }
+    ziptree = ZipTree(
+        hash="123456abcdef",
+        playfile=playfile,
+        tree=[
+            _TreeFile(hashname="a", name="a.jpg"),
+            _TreeFolder(
+                children=[
+                    _TreeFolder(
+                        children=[_TreeFile(hashname="b", name="b.jpg")],
+                        name="bar",
+                        path="foo/bar",
+                    ),
+                    _TreeFile(hashname="c", name="c.jpg"),
+                ],
+                name="foo",
+                path="foo",
+            ),
+            _TreeFile(hashname="d", name="d.jpg"),
+        ],
+    )
+    assert [
+        "a.jpg",
+        "foo/bar/b.jpg",
+        "foo/c.jpg",
+        "d.jpg",
+    ] == list(ziptree)
+
+
+@pytest.mark.parametrize(
+    "has_orjson, has_ijson",
+    [(True, True), (False, True), (False, False)],
+    ids=["orjson", "ijson", "json"],
+)
+async def test_purchases(
+    play_api: PlayAPI, mocker: MockerFixture, has_orjson: bool, has_ijson: bool
+) -> None:
+    """Purchased works should be yielded from every page."""
+    mocker.patch("dlsite_async.play.api._HAS_ORJSON", has_orjson)
+    if not has_orjson:
+        mocker.patch("dlsite_async.play.api.json_loads", json.loads)
+    if not has_ijson:
+        mocker.patch("dlsite_async.play.api.ijson", None)
+    with aioresponses() as m:
+        m.get(
+            re.compile(r"^https://play\.dlsite\.com/api/product_count"),
+            payload={"user": 3, "page_limit": 1, "concurrency": 2},
+        )
+        m.get(
+            re.compile(r"^https://play\.dlsite\.com/api/purchases"),
+            payload={"works": [_TEST_PURCHASE_JSON]},
+            repeat=True,
+        )
+        purchases = [purchase async for purchase in play_api.purchases()]
+    assert purchases == [(_TEST_PURCHASE_WORK, _TEST_PURCHASE_DATE)] * 3
+
+
+@pytest.mark.parametrize(
+    "locale, work_name",
+    [("ja_JP", "テスト作品"), ("en_US", "Test Work"), ("zh_CN", "テスト作品")],
+)
+def test_parse_purchase_locale(locale: str, work_name: str) -> None:
+    """Purchased work names should be localized."""
+    work, _ = _parse_purchase(_TEST_PURCHASE_JSON, _localized_name_getter(locale))
+    assert work.work_name == work_name
+    assert work.circle == "テストサークル"
+
+
+async def test_download_playfile(play_api: PlayAPI, tmp_path: Path) -> None:
+    """Playfile should be downloaded."""
+    dest = tmp_path / "foo" / "baz.jpg"
+    content = bytes(range(256)) * 4096
+    with aioresponses() as m:
+        m.get(
+            _URL_PATTERN,
+            body=content,
+        )
+        await play_api.download_playfile(
+            _TEST_DOWNLOAD_TOKEN, _TEST_PLAYFILE, dest, mkdir=True
+        )
+    assert dest.read_bytes() == content
+    assert list(dest.parent.iterdir()) == [dest]
+
+
+async def test_download_playfile_preallocate(
+    play_api: PlayAPI, tmp_path: Path, mocker: MockerFixture
+) -> None:
+    """Disk space should be preallocated when content length is known."""
+    fallocate = (
+        mocker.spy(os, "posix_fallocate") if hasattr(os, "posix_fallocate") else None
+    )
+    dest = tmp_path / "baz.jpg"
+    # not a multiple of the download chunk size
+    content = bytes(range(256)) * 6000 + b"x"
+    with aioresponses() as m:
+        m.get(
+            _URL_PATTERN,
+            body=content,
+            headers={"Content-Length": str(len(content))},
+        )
+        await play_api.download_playfile(_TEST_DOWNLOAD_TOKEN, _TEST_PLAYFILE, dest)
+    if fallocate is not None:
+        fallocate.assert_called_once_with(mocker.ANY, 0, len(content))
+    assert dest.stat().st_size == len(content)
+    assert dest.read_bytes() == content
+
+
+async def test_download_playfile_error(play_api: PlayAPI, tmp_path: Path) -> None:
+    """Partial download should be removed on failure."""
+    dest = tmp_path / "baz.jpg"
+    with aioresponses() as m:
+        m.get(_URL_PATTERN, status=500)
+        with pytest.raises(ClientResponseError):
+            await play_api.download_playfile(_TEST_DOWNLOAD_TOKEN, _TEST_PLAYFILE, dest)
+    assert list(tmp_path.iterdir()) == []
+
+
+async def test_download_playfile_descramble(play_api: PlayAPI, tmp_path: Path) -> None:
+    """Scrambled image playfile should be descrambled once downloaded."""
+    playfile = PlayFile(
+        length=1234,
+        type="image",
+        files={
+            "optimized": {
+                "crypt": True,
+                "name": "000000000000.png",
+                "length": 123,
+                "width": 256,
+                "height": 200,
+            },
+        },
+        hashname="123456abcdef.png",
+    )
+    scrambled = tmp_path / "scrambled.png"
+    im = Image.new("RGB", (256, 256))
+    im.paste(Image.new("RGB", (128, 128), color=(255, 0, 0)), (0, 128))
+    im.save(scrambled)
+    expected = tmp_path / "expected.png"
+    descramble(scrambled, playfile, expected)
+    dest = tmp_path / "foo" / "baz.png"
+    with aioresponses() as m:
+        m.get(_URL_PATTERN, body=scrambled.read_bytes())
+        await play_api.download_playfile(
+            _TEST_DOWNLOAD_TOKEN, playfile, dest, mkdir=True, descramble=True
+        )
+    assert list(dest.parent.iterdir()) == [dest]
+    with Image.open(dest) as actual, Image.open(expected) as im:
+        assert actual.format == "PNG"
+        assert actual.size == (256, 200)
+        assert actual.tobytes() == im.tobytes()
+
+
+async def test_download_playfile_descramble_no_pil(
+    play_api: PlayAPI, tmp_path: Path, mocker: MockerFixture
+) -> None:
+    """Scrambled image should be saved as-is when PIL is not available."""
+    mocker.patch("dlsite_async.play.api._HAS_PIL", False)
+    playfile = PlayFile(
+        length=1234,
+        type="image",
+        files={"optimized": {"crypt": True, "name": "000000000000.png"}},
+        hashname="123456abcdef.png",
+    )
+    content = b"abcd1234"
+    dest = tmp_path / "baz.png"
+    with aioresponses() as m:
+        m.get(_URL_PATTERN, body=content)
+        await play_api.download_playfile(
+            _TEST_DOWNLOAD_TOKEN, playfile, dest, descramble=True
+        )
+    assert dest.read_bytes() == content
+
+
+async def test_download_playfile_gather(tmp_path: Path, mocker: MockerFixture) -> None:
+    """Waiting downloads should not open their partial files."""
+    real_open = open
+    open_parts: list[int] = []
+
+    def _open(file: Path, *args: Any, **kwargs: Any) -> Any:
+        open_parts.append(len(list(tmp_path.glob("*.part"))))
+        return real_open(file, *args, **kwargs)
+
+    mocker.patch("dlsite_async.play.api.open", side_effect=_open, create=True)
+    async with PlayAPI(dl_concurrency=2) as play_api:
+        with aioresponses() as m:
+            m.get(_URL_PATTERN, body=b"abcd1234", repeat=True)
+            await asyncio.gather(
+                *(
+                    play_api.download_playfile(
+                        _TEST_DOWNLOAD_TOKEN, _TEST_PLAYFILE, tmp_path / f"{i}.jpg"
+                    )
+                    for i in range(20)
+                )
+            )
+    assert len(open_parts) == 20
+    # at most one other download is in progress when a part file is opened
+    assert max(open_parts) < 2
+    assert len(list(tmp_path.glob("*.jpg"))) == 20
+
+
+async def test_download_playfiles(play_api: PlayAPI, tmp_path: Path) -> None:
+    """Playfiles should be downloaded to their tree paths."""
+    content = b"abcd1234"
+    with aioresponses() as m:
+        m.get(
+            _URL_PATTERN,
+            body=content,
+        )
+        await play_api.download_playfiles(
+            _TEST_DOWNLOAD_TOKEN, _TEST_ZIPTREE, tmp_path, mkdir=True
+        )
+    assert (tmp_path / "foo" / "bar" / "baz.jpg").read_bytes() == content
@@ -0,0 +1,202 @@
+"""DLsite Play ebook viewer tests."""
+import asyncio
+import re
+from base64 import b64decode, b64encode
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import Any
+
+import pytest
+from aioresponses import CallbackResult, aioresponses
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from PIL import Image
+from pytest_mock import MockerFixture
+
+from dlsite_async.play.api import PlayAPI
+from dlsite_async.play.ebook import EbookSession, _key_stream, _xor
+from dlsite_async.play.models import PlayFile, ViewerToken, ZipTree
+
+
+_TEST_KEY = bytes(range(1, 17))
+_TEST_PLAYFILE = PlayFile(
+    length=1234,
+    type="ebook_fixed",
+    files={},
+    hashname="abcdef",
+)
+_TEST_TOKEN = ViewerToken(
+    expire_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+    key=_TEST_KEY,
+    prefix="https://play.dl.dlsite.com/csr/viewer/RJ123456",
+    key_pair_id="key",
+    policy="policy",
+    signature="signature",
+    d="d",
+    v="v",
+)
+
+
+@pytest.fixture
+def ebook(play_api: PlayAPI) -> EbookSession:
+    """Loaded ebook session fixture."""
+    session = EbookSession(
+        play_api,
+        ZipTree(hash="abcdef", playfile={}, tree=[], workno="RJ123456"),
+        _TEST_PLAYFILE,
+    )
+    session._token = _TEST_TOKEN
+    session._key_stream = _key_stream(_TEST_KEY, play_api._DL_CHUNK_SIZE)
+    session._meta = {"page_count": 1, "pages": [{"src": "pages/001.webp"}]}
+    return session
+
+
+@pytest.mark.parametrize("offset", [0, 5, 16, 1234])
+@pytest.mark.parametrize("length", [0, 1, 15, 16, 17, 1000])
+def test_xor(offset: int, length: int) -> None:
+    """Data should be XOR'd with the key stream at offset."""
+    data = bytes(i % 251 for i in range(length))
+    expected = bytes(
+        b ^ _TEST_KEY[(offset + i) % len(_TEST_KEY)] for i, b in enumerate(data)
+    )
+    assert _xor(data, _TEST_KEY, offset) == expected
+    assert _xor(expected, _TEST_KEY, offset) == data
+
+
+@pytest.mark.parametrize("offset", [0, 5, 16, 1234])
+def test_xor_key_stream(offset: int) -> None:
+    """Precomputed key stream should match the computed one."""
+    data = bytes(range(100))
+    stream = _key_stream(_TEST_KEY, len(data))
+    assert _xor(data, _TEST_KEY, offset, stream) == _xor(data, _TEST_KEY, offset)
+    short = _key_stream(_TEST_KEY, 10)
+    assert _xor(data, _TEST_KEY, offset, short) == _xor(data, _TEST_KEY, offset)
+
+
+async def test_download_page(ebook: EbookSession, tmp_path: Path) -> None:
+    """Ebook page should be downloaded and decrypted."""
+    content = bytes(range(256)) * 4096
+    with aioresponses() as m:
+        m.get(
+            re.compile(r"^https://play\.dl\.dlsite\.com/csr/viewer/RJ123456/abcdef/"),
+            body=_xor(content, _TEST_KEY),
+        )
+        await ebook.download_page(0, tmp_path)
+    dest = tmp_path / "001.webp"
+    assert dest.read_bytes() == content
+    assert list(tmp_path.iterdir()) == [dest]
+
+
+async def test_download_page_convert(ebook: EbookSession, tmp_path: Path) -> None:
+    """Ebook page should be converted to the requested format."""
+    buf = BytesIO()
+    Image.new("RGB", (64, 64), color=(255, 0, 0)).save(buf, format="webp")
+    with aioresponses() as m:
+        m.get(
+            re.compile(r"^https://play\.dl\.dlsite\.com/csr/viewer/RJ123456/abcdef/"),
+            body=_xor(buf.getvalue(), _TEST_KEY),
+        )
+        await ebook.download_page(0, tmp_path, convert="jpg")
+    dest = tmp_path / "001.jpg"
+    assert list(tmp_path.iterdir()) == [dest]
+    with Image.open(dest) as im:
+        assert im.format == "JPEG"
+        assert im.size == (64, 64)
+
+
+async def test_download_pages(ebook: EbookSession, tmp_path: Path) -> None:
+    """All ebook pages should be downloaded."""
+    ebook._meta = {
+        "page_count": 2,
+        "pages": [{"src": "pages/001.webp"}, {"src": "pages/002.webp"}],
+    }
+    content = b"abcd1234"
+    with aioresponses() as m:
+        m.get(
+            re.compile(r"^https://play\.dl\.dlsite\.com/csr/viewer/RJ123456/abcdef/"),
+            body=_xor(content, _TEST_KEY),
+            repeat=True,
+        )
+        await ebook.download_pages(tmp_path / "pages", mkdir=True)
+    assert sorted(path.name for path in (tmp_path / "pages").iterdir()) == [
+        "001.webp",
+        "002.webp",
+    ]
+    assert (tmp_path / "pages" / "002.webp").read_bytes() == content
+
+
+async def test_download_page_gather(tmp_path: Path, mocker: MockerFixture) -> None:
+    """Waiting page downloads should not open their partial files."""
+    real_open = open
+    open_parts: list[int] = []
+
+    def _open(file: Path, *args: Any, **kwargs: Any) -> Any:
+        open_parts.append(len(list(tmp_path.glob("*.part"))))
+        return real_open(file, *args, **kwargs)
+
+    mocker.patch("dlsite_async.play.ebook.open", side_effect=_open, create=True)
+    async with PlayAPI(dl_concurrency=2) as play_api:
+        ebook = EbookSession(
+            play_api,
+            ZipTree(hash="abcdef", playfile={}, tree=[], workno="RJ123456"),
+            _TEST_PLAYFILE,
+        )
+        ebook._token = _TEST_TOKEN
+        ebook._key_stream = _key_stream(_TEST_KEY, play_api._DL_CHUNK_SIZE)
+        ebook._meta = {
+            "page_count": 20,
+            "pages": [{"src": f"pages/{i:03}.webp"} for i in range(20)],
+        }
+        with aioresponses() as m:
+            m.get(
+                re.compile(r"^https://play\.dl\.dlsite\.com/csr/viewer/RJ123456/"),
+                body=_xor(b"abcd1234", _TEST_KEY),
+                repeat=True,
+            )
+            await asyncio.gather(*(ebook.download_page(i, tmp_path) for i in range(20)))
+    assert len(open_parts) == 20
+    # at most one other download is in progress when a part file is opened
+    assert max(open_parts) < 2
+    assert len(list(tmp_path.glob("*.webp"))) == 20
+
+
+async def test_download_token(ebook: EbookSession) -> None:
+    """Viewer token key should be decrypted with the session private key."""
+
+    def _token(url: Any, json: dict[str, Any], **kwargs: Any) -> CallbackResult:
+        public_key = serialization.load_der_public_key(b64decode(json["public_key"]))
+        assert isinstance(public_key, rsa.RSAPublicKey)
+        ciphertext = public_key.encrypt(
+            _TEST_KEY.hex().encode(),
+            padding.OAEP(
+                mgf=padding.MGF1(algorithm=hashes.SHA256()),
+                algorithm=hashes.SHA256(),
+                label=None,
+            ),
+        )
+        return CallbackResult(
+            payload={
+                "key": b64encode(ciphertext).decode(),
+                "expireAt": "2022-01-01T00:00:00.000000Z",
+                "prefix": _TEST_TOKEN.prefix,
+                "parameters": {
+                    "Key-Pair-Id": "key",
+                    "Policy": "policy",
+                    "Signature": "signature",
+                    "d": "d",
+                },
+            }
+        )
+
+    with aioresponses() as m:
+        m.post(
+            "https://play.dlsite.com/api/v2/viewer/token/RJ123456",
+            callback=_token,
+            repeat=True,
+        )
+        token = await ebook._download_token()
+        private_key = ebook._private_key
+        assert token.key == _TEST_KEY
+        assert (await ebook._download_token()).key == _TEST_KEY
+    assert ebook._private_key is private_key
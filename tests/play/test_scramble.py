@@ -1,13 +1,27 @@
 """DLsite Play image scrambling tests."""
+from io import BytesIO
 from pathlib import Path
 
+import pytest
 from PIL import Image
 
 from dlsite_async.play.models import PlayFile
-from dlsite_async.play.scramble import descramble
+from dlsite_async.play.scramble import _mt_tiles, descramble
 
 
-def test_descramble(tmp_path: Path) -> None:
+@pytest.fixture(scope="session")
+def scrambled_image() -> bytes:
+    """Scrambled 2x2 tile test image, encoded once per test session."""
+    im = Image.new("RGB", (256, 256))
+    im.paste(Image.new("RGB", (128, 128), color=(255, 0, 0)), (0, 128))
+    im.paste(Image.new("RGB", (128, 128), color=(0, 255, 0)), (128, 0))
+    im.paste(Image.new("RGB", (128, 128), color=(0, 0, 255)), (128, 128))
+    buf = BytesIO()
+    im.save(buf, format="BMP")
+    return buf.getvalue()
+
+
+def test_descramble(scrambled_image: bytes) -> None:
     """Image should be descrambled.
 
     Descrambles 2x2 tiled image with known seed (0).
@@ -19,15 +33,10 @@ def test_descramble(tmp_path: Path) -> None:
         red, blue
 
     Note:
-        DLsite optimized images are always jpg but we use png here so tiles
-        do not get mangled/blended by jpg compression on save().
+        DLsite optimized images are always jpg but we use (uncompressed) bmp
+        here so tiles do not get mangled/blended by jpg compression on save().
     """
-    image_file = tmp_path / "test.png"
-    im = Image.new("RGB", (256, 256))
-    im.paste(Image.new("RGB", (128, 128), color=(255, 0, 0)), (0, 128))
-    im.paste(Image.new("RGB", (128, 128), color=(0, 255, 0)), (128, 0))
-    im.paste(Image.new("RGB", (128, 128), color=(0, 0, 255)), (128, 128))
-    im.save(image_file)
+    dest = BytesIO()
     playfile = PlayFile(
         1,
         "image",
@@ -41,11 +50,81 @@ def test_descramble(tmp_path: Path) -> None:
         },
         "abc123",
     )
-    descramble(image_file, playfile)
-    with Image.open(image_file) as im:
+    descramble(BytesIO(scrambled_image), playfile, dest)
+    dest.seek(0)
+    with Image.open(dest) as im:
         px = im.load()
         assert px
         assert px[0, 0] == (0, 0, 0)
         assert px[0, 128] == (0, 0, 255)
         assert px[128, 0] == (255, 0, 0)
         assert px[128, 128] == (0, 255, 0)
+
+
+def test_descramble_crop(tmp_path: Path, scrambled_image: bytes) -> None:
+    """Descrambled image should be cropped to the original dimensions."""
+    image_file = tmp_path / "test.bmp"
+    image_file.write_bytes(scrambled_image)
+    playfile = PlayFile(
+        1,
+        "image",
+        {
+            "optimized": {
+                "name": "000000000000.png",
+                "length": 1,
+                "width": 200,
+                "height": 150,
+            }
+        },
+        "abc123",
+    )
+    descramble(image_file, playfile)
+    with Image.open(image_file) as im:
+        assert im.size == (200, 150)
+
+
+def test_descramble_palette() -> None:
+    """Palette mode images should keep their palette."""
+    im = Image.new("P", (256, 256))
+    im.putpalette([0, 0, 0, 255, 0, 0, 0, 255, 0, 0, 0, 255])
+    im.paste(1, (0, 128, 128, 256))
+    im.paste(2, (128, 0, 256, 128))
+    im.paste(3, (128, 128, 256, 256))
+    src = BytesIO()
+    im.save(src, format="PNG")
+    src.seek(0)
+    dest = BytesIO()
+    playfile = PlayFile(
+        1,
+        "image",
+        {
+            "optimized": {
+                "name": "000000000000.png",
+                "length": 1,
+                "width": 256,
+                "height": 256,
+            }
+        },
+        "abc123",
+    )
+    descramble(src, playfile, dest)
+    dest.seek(0)
+    with Image.open(dest) as actual:
+        assert actual.mode == "P"
+        rgb = actual.convert("RGB")
+        assert rgb.getpixel((0, 0)) == (0, 0, 0)
+        assert rgb.getpixel((0, 128)) == (0, 0, 255)
+        assert rgb.getpixel((128, 0)) == (255, 0, 0)
+        assert rgb.getpixel((128, 128)) == (0, 255, 0)
+
+
+@pytest.mark.parametrize(
+    "seed, tiles",
+    [
+        (0, [0, 3, 1, 2]),
+        (0x1234567, [15, 4, 8, 11, 7, 14, 3, 0, 12, 13, 10, 2, 5, 9, 1, 6]),
+    ],
+)
+def test_mt_tiles(seed: int, tiles: list[int]) -> None:
+    """Tile order should match DLsite's MT shuffle."""
+    assert _mt_tiles(seed, len(tiles)) == tiles
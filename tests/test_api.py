@@ -1,11 +1,15 @@
 """API tests."""
+import asyncio
 import re
 from copy import copy
 from dataclasses import fields, replace
 from datetime import datetime
+from pathlib import Path
+from typing import Union
 
 from aioresponses import aioresponses
 from pytest_mock import MockerFixture
+from yarl import URL
 
 from dlsite_async.api import DlsiteAPI
 from dlsite_async.circle import Circle
@@ -149,20 +153,24 @@ _CIRCLE_TEST_HTML = r"""
 """
 
 
+def _check_fields_eq(
+    expected: Union[Work, Circle], actual: Union[Work, Circle]
+) -> None:
+    # only compare fields which are set in expected, as a single dict comparison
+    mask = {
+        field.name: value
+        for field in fields(expected)
+        if (value := getattr(expected, field.name)) is not None
+    }
+    assert mask == {name: getattr(actual, name, None) for name in mask}
+
+
 def _check_work_eq(expected: Work, actual: Work) -> None:
-    for field in fields(expected):
-        name = field.name
-        value = getattr(expected, name, None)
-        if value is not None:
-            assert getattr(actual, name, None) == value
+    _check_fields_eq(expected, actual)
 
 
 def _check_circle_eq(expected: Circle, actual: Circle) -> None:
-    for field in fields(expected):
-        name = field.name
-        value = getattr(expected, name, None)
-        if value is not None:
-            assert getattr(actual, name, None) == value
+    _check_fields_eq(expected, actual)
     assert expected.maker_type == actual.maker_type
 
 
@@ -185,9 +193,11 @@ async def test_locale(mocker: MockerFixture) -> None:
         assert m.call_args.kwargs.get("params") == expected
         m.reset_mock()
 
-        api.get("http://foo/", params={"foo": "bar"})
+        params = {"foo": "bar"}
+        api.get("http://foo/", params=params)
         expected.update({"foo": "bar"})
         assert m.call_args.kwargs.get("params") == expected
+        assert params == {"foo": "bar"}
 
 
 async def test_product_info(api: DlsiteAPI) -> None:
@@ -201,6 +211,19 @@ async def test_product_info(api: DlsiteAPI) -> None:
         _check_work_eq(_TEST_INFO_WORK, work)
 
 
+async def test_product_info_cached(tmp_path: Path) -> None:
+    """Cached product info should be returned without a request."""
+    async with DlsiteAPI(cache_dir=tmp_path) as api:
+        with aioresponses() as m:
+            m.get(
+                _URL_PATTERN,
+                payload=_TEST_INFO,
+            )
+            work = await api.product_info(_TEST_PRODUCT)
+            assert work == await api.product_info(_TEST_PRODUCT)
+            _check_work_eq(_TEST_INFO_WORK, work)
+
+
 async def test_fill_work_details(api: DlsiteAPI) -> None:
     """Full product info should be filled."""
     work = copy(_TEST_INFO_WORK)
@@ -213,6 +236,66 @@ async def test_fill_work_details(api: DlsiteAPI) -> None:
         _check_work_eq(_TEST_HTML_WORK, work)
 
 
+async def test_fill_work_details_cached(tmp_path: Path) -> None:
+    """Cached work page should be parsed without a request."""
+    async with DlsiteAPI(cache_dir=tmp_path) as api:
+        with aioresponses() as m:
+            m.get(_URL_PATTERN, body=_WORK_TEST_HTML)
+            work = await api._fill_work_details(copy(_TEST_INFO_WORK))
+            assert work == await api._fill_work_details(copy(_TEST_INFO_WORK))
+            assert sum(len(calls) for calls in m.requests.values()) == 1
+            _check_work_eq(_TEST_HTML_WORK, work)
+
+
+async def test_fill_work_details_cached_invalid_utf8(tmp_path: Path) -> None:
+    """Invalid UTF-8 in a cached work page should not fail parsing."""
+    body = _WORK_TEST_HTML.encode().replace(b"</body>", b"\xff</body>")
+    async with DlsiteAPI(cache_dir=tmp_path) as api:
+        with aioresponses() as m:
+            m.get(_URL_PATTERN, body=body)
+            work = await api._fill_work_details(copy(_TEST_INFO_WORK))
+            _check_work_eq(_TEST_HTML_WORK, work)
+
+
+async def test_fill_work_details_announce(api: DlsiteAPI) -> None:
+    """Announce page should be used when the work page is unavailable."""
+    work = replace(_TEST_INFO_WORK, regist_date=None)
+    with aioresponses() as m:
+        m.get(re.compile(r"^https://www\.dlsite\.com/maniax/work/"), status=404)
+        m.get(
+            re.compile(r"^https://www\.dlsite\.com/maniax/announce/"),
+            body=_WORK_TEST_HTML,
+        )
+        work = await api._fill_work_details(work)
+        _check_work_eq(replace(_TEST_HTML_WORK, regist_date=None), work)
+
+
+async def test_fill_work_details_released(api: DlsiteAPI) -> None:
+    """Announce page should not be requested for released works."""
+    work = copy(_TEST_INFO_WORK)
+    with aioresponses() as m:
+        m.get(_URL_PATTERN, body=_WORK_TEST_HTML)
+        work = await api._fill_work_details(work)
+        assert [str(url) for _, url in m.requests] == [
+            "https://www.dlsite.com/maniax/work/=/product_id/RJ1234.html"
+        ]
+    _check_work_eq(_TEST_HTML_WORK, work)
+
+
+async def test_get_circle_concurrent(api: DlsiteAPI) -> None:
+    """Concurrent requests for the same circle should share one request."""
+    with aioresponses() as m:
+        m.get(
+            _URL_PATTERN,
+            body=_CIRCLE_TEST_HTML,
+        )
+        circles = await asyncio.gather(
+            api.get_circle(_TEST_MAKER), api.get_circle(_TEST_MAKER)
+        )
+        for circle in circles:
+            _check_circle_eq(_TEST_CIRCLE, circle)
+
+
 async def test_get_circle(api: DlsiteAPI) -> None:
     """Full circle info should be filled."""
     with aioresponses() as m:
@@ -222,3 +305,32 @@ async def test_get_circle(api: DlsiteAPI) -> None:
         )
         circle = await api.get_circle(_TEST_MAKER)
         _check_circle_eq(_TEST_CIRCLE, circle)
+
+
+async def test_get_circle_cached(tmp_path: Path) -> None:
+    """Cached circle page should be parsed without a request."""
+    async with DlsiteAPI(cache_dir=tmp_path) as api:
+        with aioresponses() as m:
+            m.get(_URL_PATTERN, body=_CIRCLE_TEST_HTML)
+            circle = await api.get_circle(_TEST_MAKER)
+            assert circle == await api.get_circle(_TEST_MAKER)
+            assert sum(len(calls) for calls in m.requests.values()) == 1
+            _check_circle_eq(_TEST_CIRCLE, circle)
+
+
+async def test_warm_up() -> None:
+    """Connection should be warmed up in the background on enter."""
+    with aioresponses() as m:
+        m.head("https://www.dlsite.com/")
+        async with DlsiteAPI(warm_up=True) as api:
+            assert api._warmup is not None
+            await api._warmup
+        assert list(m.requests) == [("HEAD", URL("https://www.dlsite.com/"))]
+
+
+async def test_warm_up_disabled() -> None:
+    """Connection should not be warmed up by default."""
+    with aioresponses() as m:
+        async with DlsiteAPI() as api:
+            assert api._warmup is None
+        assert not m.requests
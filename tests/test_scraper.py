@@ -0,0 +1,140 @@
+"""HTML scraper tests."""
+from datetime import datetime
+from html import escape
+from typing import AsyncIterator
+
+import pytest
+
+from dlsite_async._scraper import _to_datetime, parse_work_html, parse_work_stream
+from dlsite_async.exceptions import ScrapingError
+
+
+_MAKER_TEST_HTML = r"""
+<html>
+<head />
+<body>
+<table id="work_maker">
+  <tbody>
+    <tr>
+      <th>サークル名</th>
+      <td><span class="maker_name"><a href="#">Test Circle</a></span></td>
+    </tr>
+    <tr>
+      <th>出版社名</th>
+      <td><span class="maker_name"><a href="#">Test Publisher</a></span></td>
+    </tr>
+  </tbody>
+</table>
+<table id="work_outline">
+  <tbody />
+</table>
+</body>
+</html>
+"""
+
+
+def test_parse_maker_rows() -> None:
+    """Maker names should be parsed from their own table cell."""
+    info = parse_work_html(_MAKER_TEST_HTML)
+    assert info["circle"] == "Test Circle"
+    assert info["publisher"] == "Test Publisher"
+
+
+async def test_parse_work_stream() -> None:
+    """Streamed HTML should be parsed incrementally."""
+
+    async def _chunks() -> AsyncIterator[bytes]:
+        content = _MAKER_TEST_HTML.encode("utf-8")
+        for i in range(0, len(content), 7):
+            yield content[i : i + 7]
+
+    assert await parse_work_stream(_chunks()) == parse_work_html(_MAKER_TEST_HTML)
+
+
+async def test_parse_work_stream_control_chars() -> None:
+    """Invalid XML characters should be stripped from streamed HTML."""
+    content = (
+        _MAKER_TEST_HTML.replace("Test Circle", "Foo\x08bar\x01baz")
+        .replace(
+            "<tbody />",
+            "<tbody><tr><th>ジャンル</th>"
+            '<td><a href="#">G\x01enre</a></td></tr></tbody>',
+        )
+        .encode("utf-8")
+    )
+
+    async def _chunks() -> AsyncIterator[bytes]:
+        # split multi-byte characters across chunks
+        for i in range(0, len(content), 5):
+            yield content[i : i + 5]
+
+    info = await parse_work_stream(_chunks())
+    assert info["circle"] == "Foobarbaz"
+    assert info["genre"] == ["Genre"]
+    assert info == parse_work_html(content.decode("utf-8"))
+
+
+def test_parse_slider_data() -> None:
+    """Sample images should not include the main work image."""
+    info = parse_work_html(
+        """
+        <html><body>
+        <table id="work_outline" />
+        <div class="product-slider-data">
+          <div data-src="//img.dlsite.jp/RJ1234_img_main.jpg"></div>
+          <div data-src="//img.dlsite.jp/RJ1234_img_smp1.jpg"></div>
+          <div data-src=""></div>
+          <div></div>
+          <div data-src="//img.dlsite.jp/RJ1234_img_smp2.jpg"></div>
+        </div>
+        </body></html>
+        """
+    )
+    assert info["sample_images"] == [
+        "//img.dlsite.jp/RJ1234_img_smp1.jpg",
+        "//img.dlsite.jp/RJ1234_img_smp2.jpg",
+    ]
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ("Test description", "Test description"),
+        (
+            'Test description "DLsite" is a shop. Enjoy DLsite!',
+            "Test description",
+        ),
+        (
+            "テスト説明「DLsite がるまに」は女性向け。「DLsite がるまに」!",
+            "テスト説明",
+        ),
+    ],
+)
+def test_parse_description(content: str, expected: str) -> None:
+    """DLsite boilerplate should be stripped from descriptions."""
+    info = parse_work_html(
+        f'<html><head><meta name="description" content="{escape(content)}" />'
+        '</head><body><table id="work_outline" /></body></html>'
+    )
+    assert info["description"] == expected
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2022年01月02日", datetime(2022, 1, 2)),
+        ("2022年1月2日", datetime(2022, 1, 2)),
+        ("Jan/02/2022", datetime(2022, 1, 2)),
+        ("January/2/2022", datetime(2022, 1, 2)),
+        ("Sep/30/2022", datetime(2022, 9, 30)),
+    ],
+)
+def test_to_datetime(value: str, expected: datetime) -> None:
+    """Date strings should be parsed."""
+    assert _to_datetime(value) == expected
+
+
+def test_to_datetime_failed() -> None:
+    """Invalid date strings should fail to parse."""
+    with pytest.raises(ScrapingError):
+        _to_datetime("2022/01/02")
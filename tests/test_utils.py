@@ -1,8 +1,17 @@
 """Utils tests."""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
 import pytest
 
 from dlsite_async.exceptions import InvalidIDError
-from dlsite_async.utils import find_maker_id, find_product_id
+from dlsite_async.utils import (
+    find_ids,
+    find_maker_id,
+    find_product_id,
+    fromisoformat,
+    parse_timestamp,
+)
 
 
 @pytest.mark.parametrize(
@@ -47,3 +56,75 @@ def test_find_maker_id_failed(s: str) -> None:
     """Should fail to match a maker ID."""
     with pytest.raises(InvalidIDError):
         find_maker_id(s)
+
+
+@pytest.mark.parametrize(
+    "s, product_id, maker_id",
+    [
+        ("[RG1234] rj5678 Title", "RJ5678", "RG1234"),
+        ("RJ1234 RJ5678 BG1234 VG5678", "RJ1234", "BG1234"),
+        ("VJ1234", "VJ1234", None),
+        ("ARG1234 RG-1234", None, None),
+    ],
+)
+def test_find_ids(s: str, product_id: Optional[str], maker_id: Optional[str]) -> None:
+    """Should match expected product and maker IDs."""
+    assert find_ids(s) == (product_id, maker_id)
+
+
+_JST = timezone(timedelta(hours=9))
+
+
+@pytest.mark.parametrize(
+    "timestamp, expected",
+    [
+        ("2022-01-01T00:00:00Z", datetime(2022, 1, 1, tzinfo=timezone.utc)),
+        (
+            "2022-01-01T00:00:00.000000Z",
+            datetime(2022, 1, 1, tzinfo=timezone.utc),
+        ),
+        ("2022-01-01T00:00:00+09:00", datetime(2022, 1, 1, tzinfo=_JST)),
+        ("2022-01-01T00:00:00+0900", datetime(2022, 1, 1, tzinfo=_JST)),
+        (
+            "2022-01-01T00:00:00.5Z",
+            datetime(2022, 1, 1, 0, 0, 0, 500000, tzinfo=timezone.utc),
+        ),
+        (
+            "2022-01-01T00:00:00.12-0130",
+            datetime(
+                2022,
+                1,
+                1,
+                0,
+                0,
+                0,
+                120000,
+                tzinfo=timezone(-timedelta(hours=1, minutes=30)),
+            ),
+        ),
+    ],
+)
+def test_fromisoformat(timestamp: str, expected: datetime) -> None:
+    """Should parse DLsite Play API timestamps."""
+    assert fromisoformat(timestamp) == expected
+
+
+@pytest.mark.parametrize("timestamp", ["", "2022-13-01T00:00:00Z", "some date"])
+def test_fromisoformat_failed(timestamp: str) -> None:
+    """Should fail to parse an invalid timestamp."""
+    with pytest.raises(ValueError):
+        fromisoformat(timestamp)
+
+
+def test_parse_timestamp() -> None:
+    """Should parse naive ZipTree timestamps."""
+    assert parse_timestamp("2022-09-24 17:42:01") == datetime(2022, 9, 24, 17, 42, 1)
+
+
+@pytest.mark.parametrize(
+    "timestamp", ["", "2022-09-24", "2022-13-01 00:00:00", "2022/09/24 17:42:01"]
+)
+def test_parse_timestamp_failed(timestamp: str) -> None:
+    """Should fail to parse an invalid timestamp."""
+    with pytest.raises(ValueError):
+        parse_timestamp(timestamp)